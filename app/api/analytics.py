@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException, Query, status, Depends
+from datetime import date
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_async_db
+from ..models.analytics_model import ComplaintStats
+from ..services.analytics_service import AsyncAnalyticsService, DIMENSIONS
+from ..dependencies import get_current_active_user, has_role
+from ..models.sql_models import UserSQL
+
+router = APIRouter()
+
+@router.get("/analytics/complaints", response_model=ComplaintStats)
+async def get_complaint_stats(
+    group_by: str = Query("department", description="comma-separated: day, department, category, status"),
+    day_from: Optional[date] = Query(None, alias="from"),
+    day_to: Optional[date] = Query(None, alias="to"),
+    department: Optional[str] = None,
+    category: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSQL = Depends(get_current_active_user)
+):
+    if not has_role(["department_admin"])(current_user=current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can view complaint analytics")
+
+    dimensions = [dimension.strip() for dimension in group_by.split(",") if dimension.strip()]
+    unknown = [dimension for dimension in dimensions if dimension not in DIMENSIONS]
+    if unknown or len(set(dimensions)) != len(dimensions):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"group_by takes distinct values from: {', '.join(DIMENSIONS)}")
+
+    # Served from complaint_rollups: cost follows the number of groups, not complaints
+    return await AsyncAnalyticsService(db).complaint_stats(
+        dimensions, day_from=day_from, day_to=day_to, department=department, category=category, status=status_filter
+    )
@@ -1,19 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from ..db import get_db
+from ..db import get_async_db
 from ..models.user_model import Token, UserCreate, UserInDB
-from ..services.auth_service import AuthService
+from ..services.auth_service import AsyncAuthService
 from ..core.security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter()
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    auth_service = AuthService(db)
-    user = auth_service.authenticate_user(form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    auth_service = AsyncAuthService(db)
+    user = await auth_service.authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -28,13 +28,13 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=UserInDB)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    auth_service = AuthService(db)
-    db_user = auth_service.get_user(user.email)
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    auth_service = AsyncAuthService(db)
+    db_user = await auth_service.get_user(user.email)
     if db_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
     
-    new_user = auth_service.create_user(user)
+    new_user = await auth_service.create_user(user)
     return new_user
 
 
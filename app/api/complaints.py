@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Body, HTTPException, status, Depends
-from sqlalchemy.orm import Session
-from ..db import get_db
-from ..models.complaint_model import Complaint, ComplaintCreate, ComplaintStatusUpdate # Import ComplaintStatusUpdate
-from ..services.complaint_service import ComplaintService
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response, status, Depends
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import AsyncIterator, List, Literal, Optional, Tuple
+import json
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_async_db
+from ..models.complaint_model import Complaint, ComplaintCreate, ComplaintQueuePage, ComplaintReprioritize, ComplaintStatusUpdate
+from ..services.complaint_service import AsyncComplaintService, BULK_BATCH_SIZE, InvalidCursor
+from ..services.export_service import EXPORT_MEDIA_TYPES, ExportService
 from ..dependencies import get_current_active_user, has_role # Import dependencies
 from ..models.sql_models import UserSQL # Import UserSQL to type hint current_user
 
@@ -11,65 +17,170 @@ router = APIRouter()
 @router.post("/complaints", response_model=Complaint)
 async def submit_complaint(
     complaint: ComplaintCreate = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user) # Require authentication
 ):
     # Only 'citizen' role can submit complaints
     if not has_role(["citizen"])(current_user=current_user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only citizens can submit complaints")
 
-    complaint_service = ComplaintService(db)
-    new_complaint = complaint_service.create_complaint(complaint)
+    complaint_service = AsyncComplaintService(db)
+    # Classification runs off the event loop so concurrent submissions reach the classifier together and get micro-batched
+    new_complaint = await complaint_service.create_complaint(complaint)
     return new_complaint
 
+async def _ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    # Splits the request body into (line number, line) as it arrives; blank lines are skipped
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    if buffer.strip():
+        yield line_number + 1, buffer
+
+async def _insert_batch(complaint_service: AsyncComplaintService, batch: List[Tuple[int, ComplaintCreate]]) -> List[dict]:
+    try:
+        created = await complaint_service.create_complaints([complaint for _, complaint in batch])
+    except SQLAlchemyError as e:
+        await complaint_service.db.rollback()
+        return [{"line": line_number, "error": f"Insert failed: {e.__class__.__name__}"} for line_number, _ in batch]
+    return [
+        {"line": line_number, "id": complaint.id, "category": complaint.category,
+         "urgency_score": complaint.urgency_score, "department": complaint.department,
+         "duplicate_of": complaint.duplicate_of}
+        for (line_number, _), complaint in zip(batch, created)
+    ]
+
+@router.post("/complaints/bulk")
+async def submit_complaints_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSQL = Depends(get_current_active_user)
+):
+    # Call-centre and partner batches: one complaint per NDJSON line, answered with one result per line
+    if not has_role(["department_admin"])(current_user=current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can bulk-submit complaints")
+
+    complaint_service = AsyncComplaintService(db)
+    results = []
+    batch = []
+    # Lines are validated as they stream in and every BULK_BATCH_SIZE valid complaints are classified
+    # and inserted in their own transaction, so a failure only loses the batch it happened in.
+    async for line_number, line in _ndjson_lines(request.stream()):
+        try:
+            batch.append((line_number, ComplaintCreate(**json.loads(line))))
+        except (ValueError, TypeError) as e:
+            results.append({"line": line_number, "error": str(e)})
+        if len(batch) >= BULK_BATCH_SIZE:
+            results += await _insert_batch(complaint_service, batch)
+            batch = []
+    if batch:
+        results += await _insert_batch(complaint_service, batch)
+
+    # Sent once the body is consumed: a streaming response would race the body reader for receive()
+    results.sort(key=lambda result: result["line"])
+    return Response(content="".join(json.dumps(result) + "\n" for result in results), media_type="application/x-ndjson")
+
+# Declared before /complaints/{complaint_id} so "sorted" isn't captured as a complaint id
+@router.get("/complaints/sorted", response_model=ComplaintQueuePage)
+async def get_sorted_complaints(
+    department: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSQL = Depends(get_current_active_user)
+):
+    if not has_role(["department_admin"])(current_user=current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can view sorted complaints")
+
+    complaint_service = AsyncComplaintService(db)
+    try:
+        items, next_cursor = await complaint_service.get_priority_queue(department, status_filter, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Items are built straight from typed columns; serialize the page once instead of having
+    # FastAPI validate it against response_model again (which stays for the OpenAPI schema)
+    page = ComplaintQueuePage.model_construct(items=items, next_cursor=next_cursor)
+    return Response(content=page.model_dump_json(), media_type="application/json")
+
+@router.get("/complaints/export")
+async def export_complaints(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    department: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    current_user: UserSQL = Depends(get_current_active_user)
+):
+    if not has_role(["department_admin"])(current_user=current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can export complaints")
+
+    # Streamed chunk by chunk off a server-side cursor; a 2M-row audit export never sits in memory
+    export_service = ExportService()
+    statement = export_service.complaints_statement(department, status_filter, created_from, created_to)
+    return StreamingResponse(
+        export_service.stream(statement, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="complaints.{export_format}"'}
+    )
+
 @router.get("/complaints/{complaint_id}", response_model=Complaint)
 async def get_complaint_status(
     complaint_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user) # Require authentication
 ):
     # Both 'citizen' and 'department_admin' can view complaints
     if not has_role(["citizen", "department_admin"])(current_user=current_user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view complaints")
 
-    complaint_service = ComplaintService(db)
-    complaint = complaint_service.get_complaint_by_id(complaint_id)
+    complaint_service = AsyncComplaintService(db)
+    complaint = await complaint_service.get_complaint_by_id(complaint_id)
     if complaint is None:
         raise HTTPException(status_code=404, detail="Complaint not found")
     return complaint
 
-@router.get("/complaints/sorted", response_model=list[Complaint])
-async def get_sorted_complaints(
-    db: Session = Depends(get_db),
+@router.patch("/complaints/{complaint_id}/status", response_model=Complaint)
+async def update_complaint_status(
+    complaint_id: int,
+    status_update: ComplaintStatusUpdate = Body(...),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user)
 ):
     if not has_role(["department_admin"])(current_user=current_user):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can view sorted complaints")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can update complaint status")
 
-    complaint_service = ComplaintService(db)
-    # Assuming get_all_complaints can be modified to accept sorting parameters or we fetch all and sort here.
-    # For simplicity, let's fetch all and sort in Python for now. We can optimize later if needed.
-    complaints = complaint_service.get_all_complaints()
+    complaint_service = AsyncComplaintService(db)
+    updated_complaint = await complaint_service.update_complaint_status(complaint_id, status_update.status)
     
-    # Sort complaints by urgency_score in descending order, handling None values gracefully
-    sorted_complaints = sorted(complaints, key=lambda c: c.urgency_score if c.urgency_score is not None else -1, reverse=True)
+    if updated_complaint is None:
+        raise HTTPException(status_code=404, detail="Complaint not found")
     
-    return sorted_complaints
+    return updated_complaint
 
-@router.patch("/complaints/{complaint_id}/status", response_model=Complaint)
-async def update_complaint_status(
+@router.patch("/complaints/{complaint_id}/priority", response_model=Complaint)
+async def reprioritize_complaint(
     complaint_id: int,
-    status_update: ComplaintStatusUpdate = Body(...),
-    db: Session = Depends(get_db),
+    priority: ComplaintReprioritize = Body(...),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user)
 ):
     if not has_role(["department_admin"])(current_user=current_user):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can update complaint status")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can reprioritize complaints")
+    if priority.urgency_score is None and priority.sla_hours is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide urgency_score and/or sla_hours")
+
+    complaint_service = AsyncComplaintService(db)
+    # Stored first, then moved within its department's dispatch queue
+    updated_complaint = await complaint_service.reprioritize_complaint(complaint_id, priority.urgency_score, priority.sla_hours)
 
-    complaint_service = ComplaintService(db)
-    updated_complaint = complaint_service.update_complaint_status(complaint_id, status_update.status)
-    
     if updated_complaint is None:
         raise HTTPException(status_code=404, detail="Complaint not found")
-    
+
     return updated_complaint
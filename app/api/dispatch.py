@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Query, status, Depends
+from datetime import datetime, timezone
+import math
+import time
+from ..models.dispatch_model import DispatchTask, DispatchTasks
+from ..services.dispatch_service import dispatch_queue
+from ..dependencies import get_current_active_user, has_role
+from ..models.sql_models import UserSQL
+
+router = APIRouter()
+
+@router.get("/dispatch/next", response_model=DispatchTasks)
+async def get_next_tasks(
+    department: str,
+    n: int = Query(10, ge=1, le=200),
+    current_user: UserSQL = Depends(get_current_active_user)
+):
+    # Polled by field-officer apps, so it is answered from the in-memory dispatch queue:
+    # O(n log n) however many complaints are open, no database access
+    if not has_role(["department_admin", "field_officer"])(current_user=current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department staff can view the dispatch queue")
+
+    queued, entries = dispatch_queue.next_tasks(department, n)
+    now = time.time()
+    tasks = [
+        DispatchTask(
+            complaint_id=complaint_id,
+            urgency_score=urgency_score,
+            sla_deadline=None if math.isinf(deadline) else datetime.fromtimestamp(deadline, timezone.utc),
+            overdue=deadline < now
+        )
+        for complaint_id, urgency_score, deadline in entries
+    ]
+    return DispatchTasks(department=department, queued=queued, tasks=tasks)
@@ -1,22 +1,26 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Body, Depends
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from ..db import get_db
-from ..services.pdf_processing_service import PdfProcessingService
-from ..services.document_generation_service import DocumentGenerationService
-from ..services.complaint_service import ComplaintService # Import ComplaintService
-from ..models.circular_model import Circular, CircularCreate
+from fastapi import APIRouter, UploadFile, File, HTTPException, status, Body, Depends, Response, Query
+from fastapi.responses import HTMLResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_async_db
+from ..services.pdf_processing_service import AsyncPdfProcessingService, PdfProcessingService
+from ..services.circular_ingestion_service import CircularIngestionService, IngestionQueueFull
+from ..services.document_generation_service import AsyncDocumentGenerationService
+from ..services.export_service import EXPORT_MEDIA_TYPES, ExportService
+from ..services.complaint_service import AsyncComplaintService
+from ..models.circular_model import Circular, CircularCreate, CircularJob, CircularSearchResults, CircularPages
 from ..models.document_models import RTIDocument, SchemeApplication, OfficialNotice, WorkOrder
 from ..dependencies import get_current_active_user, has_role
 from ..models.sql_models import UserSQL
-from typing import List, Dict # Import Dict for the response model
+from datetime import datetime
+from typing import List, Dict, Literal, Optional # Import Dict for the response model
 
 router = APIRouter()
 
-@router.post("/upload-circular/", response_model=Circular)
+@router.post("/upload-circular/", response_model=CircularJob, status_code=status.HTTP_202_ACCEPTED)
 async def upload_circular(
+    response: Response,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user) # Require authentication
 ):
     if not has_role(["department_admin"])(current_user=current_user):
@@ -25,17 +29,39 @@ async def upload_circular(
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
+    # Extraction, NLP and persistence run on the ingestion worker pool; the client polls the job.
+    # The bytes are handed to PyMuPDF as-is, nothing is written back to disk.
+    pdf_content = await file.read()
+    if not pdf_content.startswith(b"%PDF-"):
+        raise HTTPException(status_code=400, detail="Uploaded file is not a valid PDF")
+
+    ingestion_service = CircularIngestionService()
+    # Departments re-upload the same circulars constantly; an identical PDF returns the stored circular
+    existing = await AsyncPdfProcessingService(db).get_circular_by_hash(PdfProcessingService.content_hash(pdf_content))
+    if existing:
+        response.status_code = status.HTTP_200_OK
+        return ingestion_service.completed_duplicate(file.filename, existing)
     try:
-        pdf_processing_service = PdfProcessingService(db)
-        pdf_content = await file.read()
-        circular_data = pdf_processing_service.save_circular_data(file.filename, pdf_content)
-        return circular_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to process PDF: {e}")
+        return ingestion_service.submit(file.filename, pdf_content)
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Circular ingestion is busy, retry later: {e}")
+
+@router.get("/circulars/jobs/{job_id}", response_model=CircularJob)
+async def get_circular_job(
+    job_id: str,
+    current_user: UserSQL = Depends(get_current_active_user) # Require authentication
+):
+    if not has_role(["department_admin"])(current_user=current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can view ingestion jobs")
+
+    job = CircularIngestionService().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
 
 @router.get("/circulars", response_model=List[Circular])
 async def get_all_circulars(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user) # Require authentication
 ):
     # Both citizens and department admins should be able to view circulars
@@ -43,24 +69,78 @@ async def get_all_circulars(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view circulars")
 
     try:
-        pdf_processing_service = PdfProcessingService(db)
-        circulars = pdf_processing_service.get_all_circulars()
+        pdf_processing_service = AsyncPdfProcessingService(db)
+        circulars = await pdf_processing_service.get_all_circulars()
         return circulars
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve circulars: {e}")
 
+@router.get("/circulars/search", response_model=CircularSearchResults)
+async def search_circulars(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSQL = Depends(get_current_active_user) # Require authentication
+):
+    if not has_role(["citizen", "department_admin"])(current_user=current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to search circulars")
+
+    try:
+        return await AsyncPdfProcessingService(db).search(q, page=page, page_size=page_size)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search circulars: {e}")
+
+@router.get("/circulars/export")
+async def export_circulars(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    language: Optional[str] = None,
+    uploaded_from: Optional[datetime] = Query(None, alias="from"),
+    uploaded_to: Optional[datetime] = Query(None, alias="to"),
+    current_user: UserSQL = Depends(get_current_active_user) # Require authentication
+):
+    if not has_role(["department_admin"])(current_user=current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can export circulars")
+
+    export_service = ExportService()
+    statement = export_service.circulars_statement(language, uploaded_from, uploaded_to)
+    return StreamingResponse(
+        export_service.stream(statement, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="circulars.{export_format}"'}
+    )
+
+@router.get("/circulars/{circular_id}/pages", response_model=CircularPages)
+async def get_circular_pages(
+    circular_id: int,
+    from_page: int = Query(1, alias="from", ge=1),
+    to_page: Optional[int] = Query(None, alias="to", ge=1),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSQL = Depends(get_current_active_user) # Require authentication
+):
+    if not has_role(["citizen", "department_admin"])(current_user=current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view circulars")
+    if to_page is not None and to_page < from_page:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+
+    # At most MAX_PAGES_PER_REQUEST pages come back; clients continue from next_from
+    pages = await AsyncPdfProcessingService(db).get_circular_pages(circular_id, from_page, to_page)
+    if pages is None:
+        raise HTTPException(status_code=404, detail="Circular not found")
+    return pages
+
 @router.post("/generate-rti", response_class=HTMLResponse)
 async def generate_rti(
     rti_data: RTIDocument = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user) # Require authentication
 ):
     if not has_role(["citizen", "department_admin"])(current_user=current_user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to generate RTI documents")
 
     try:
-        doc_generation_service = DocumentGenerationService(db)
-        document_content = doc_generation_service.generate_rti_document(rti_data)
+        doc_generation_service = AsyncDocumentGenerationService(db)
+        document_content = await doc_generation_service.generate_rti_document(rti_data)
         return HTMLResponse(content=document_content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate RTI document: {e}")
@@ -68,15 +148,15 @@ async def generate_rti(
 @router.post("/generate-scheme-application", response_class=HTMLResponse)
 async def generate_scheme_application(
     app_data: SchemeApplication = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user) # Require authentication
 ):
     if not has_role(["citizen", "department_admin"])(current_user=current_user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to generate scheme applications")
 
     try:
-        doc_generation_service = DocumentGenerationService(db)
-        document_content = doc_generation_service.generate_scheme_application(app_data)
+        doc_generation_service = AsyncDocumentGenerationService(db)
+        document_content = await doc_generation_service.generate_scheme_application(app_data)
         return HTMLResponse(content=document_content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate scheme application: {e}")
@@ -84,15 +164,15 @@ async def generate_scheme_application(
 @router.post("/generate-official-notice", response_class=HTMLResponse)
 async def generate_official_notice(
     notice_data: OfficialNotice = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user) # Require authentication
 ):
     if not has_role(["department_admin"])(current_user=current_user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can generate official notices")
 
     try:
-        doc_generation_service = DocumentGenerationService(db)
-        document_content = doc_generation_service.generate_official_notice(notice_data)
+        doc_generation_service = AsyncDocumentGenerationService(db)
+        document_content = await doc_generation_service.generate_official_notice(notice_data)
         return HTMLResponse(content=document_content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate official notice: {e}")
@@ -100,18 +180,18 @@ async def generate_official_notice(
 @router.post("/generate-work-order", response_model=Dict[str, str]) # Change response_class to response_model for JSON
 async def generate_work_order(
     work_order_data: WorkOrder = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserSQL = Depends(get_current_active_user) # Require authentication
 ):
     if not has_role(["department_admin"])(current_user=current_user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only department administrators can generate work orders")
 
     try:
-        doc_generation_service = DocumentGenerationService(db)
-        complaint_service = ComplaintService(db) # Initialize ComplaintService
+        doc_generation_service = AsyncDocumentGenerationService(db)
+        complaint_service = AsyncComplaintService(db)
 
         if work_order_data.complaint_id:
-            complaint = complaint_service.get_complaint_by_id(int(work_order_data.complaint_id))
+            complaint = await complaint_service.get_complaint_by_id(int(work_order_data.complaint_id))
             if complaint:
                 # Pre-fill work_order_data from complaint details
                 if not work_order_data.task_description and complaint.description:
@@ -130,7 +210,7 @@ async def generate_work_order(
                 if not work_order_data.caller_contact:
                     work_order_data.caller_contact = "N/A (Contact via Complaint System)"
 
-        document_content = doc_generation_service.generate_work_order(work_order_data)
+        document_content = await doc_generation_service.generate_work_order(work_order_data)
         return {"generated_html": document_content, **work_order_data.dict(exclude_unset=True)} # Return JSON
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate work order: {e}")
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Response, status
+
+from ..ml import predict
+from ..models.categorization_model import categorizer
+
+router = APIRouter()
+
+@router.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+async def readiness(response: Response):
+    # Not ready until the complaint classifier has been loaded during startup
+    if not categorizer.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "ready": categorizer.ready,
+        "model": "xgboost" if categorizer.model_loaded else "keyword-fallback",
+        "model_version": categorizer.model_version if categorizer.ready else None,
+        "model_error": categorizer.load_error,
+        "prediction_cache": predict.prediction_cache.stats()
+    }
@@ -1,17 +1,38 @@
-from pydantic import BaseSettings
+from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-app_name: str = "CivicDoc"
-mongodb_uri: str = "mongodb://localhost:27017"
-mongodb_db: str = "civicdoc"
-model_path: str = "data/models/classifier.pkl"
-tfidf_path: str = "data/models/tfidf.pkl"
-supported_langs: list = ["en","hi","kn","mr","ta","te"]
+    app_name: str = "CivicDoc"
+    # Any SQLAlchemy URL, e.g. postgresql+psycopg2://civicdoc:secret@db:5432/civicdoc for multi-node deployments
+    database_url: str = "sqlite:///./sql_app.db"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    # SQLite only: WAL lets readers run alongside the single writer, and writers wait for the lock
+    # (busy timeout) instead of failing with "database is locked"
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 268435456 # 256 MiB
+    sqlite_cache_size_kib: int = 65536 # page cache per connection
+    model_path: str = "data/models/classifier.pkl"
+    tfidf_path: str = "data/models/tfidf.pkl"
+    # mmap-able export of the two pickles above; preferred when present (see app/ml/compact_model.py)
+    compact_model_path: str = "data/models/complaint_model.cdm"
+    # Complaint classification micro-batching: flush after this many texts or this long, whichever first
+    inference_max_batch_size: int = 64
+    inference_max_wait_ms: float = 2.0
+    # Cache of predictions keyed on normalized complaint text; size 0 disables it
+    prediction_cache_size: int = 10000
+    prediction_cache_ttl_seconds: float = 3600
+    # Estimated Jaccard similarity (of character shingles) at which a new complaint is linked to an open one
+    duplicate_similarity_threshold: float = 0.6
+    supported_langs: list = ["en","hi","kn","mr","ta","te"]
 
 
-class Config:
-env_file = ".env"
+    class Config:
+        env_file = ".env"
 
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -1,22 +1,125 @@
-from sqlalchemy import create_engine
+import json
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from .config import settings
+from .migrations import data_migration, run_data_migrations
 from .models.sql_models import Base
 
-# SQLite connection string
-# The database file will be created in the project root
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+# Defaults to a SQLite file in the project root; set DATABASE_URL to run against PostgreSQL
+SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _engine_options(url) -> dict:
+    if url.get_backend_name() != "sqlite":
+        return {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout_seconds,
+            "pool_recycle": settings.db_pool_recycle_seconds,
+            "pool_pre_ping": True,
+        }
+    options = {"connect_args": {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000}}
+    if url.database not in (None, "", ":memory:"):
+        options.update(pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow,
+                       pool_timeout=settings.db_pool_timeout_seconds)
+    return options
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}") # negative means KiB, not pages
+    cursor.close()
+
+def create_db_engine(database_url: str):
+    url = make_url(database_url)
+    db_engine = create_engine(url, **_engine_options(url))
+    if url.get_backend_name() == "sqlite":
+        event.listen(db_engine, "connect", _apply_sqlite_pragmas)
+    return db_engine
+
+# Async drivers for the same databases; the sync engine stays for startup, scripts and worker threads
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def create_async_db_engine(database_url: str):
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    db_engine = create_async_engine(url, **_engine_options(url))
+    if backend == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return db_engine
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL)
+# expire_on_commit=False: attributes can't be lazily reloaded outside an await, so keep them after commit
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+    run_data_migrations(engine)
+
+def upgrade_schema():
+    # create_all only creates missing tables; bring existing tables up to date with the models
+    # by adding any new (nullable) columns and their indexes.
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+@data_migration("0001_complaint_lists_to_json")
+def _complaint_lists_to_json(conn):
+    # The complaint list columns used to hold comma-joined text; rewrite them as JSON arrays
+    columns = ["required_resources", "suggested_actions", "tools_required", "safety_notes"]
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(f"SELECT id, {', '.join(columns)} FROM complaints WHERE id > :last_id ORDER BY id LIMIT 1000"),
+            {"last_id": last_id}
+        ).mappings().all()
+        if not rows:
+            return
+        updates = []
+        for row in rows:
+            values = {}
+            for column in columns:
+                value = row[column]
+                if not isinstance(value, str): # NULL, or already decoded by a native JSON column
+                    continue
+                try:
+                    if isinstance(json.loads(value), list):
+                        continue
+                except ValueError:
+                    pass
+                values[column] = json.dumps([item.strip() for item in value.split(",") if item.strip()])
+            if values:
+                updates.append((row["id"], values))
+        for complaint_id, values in updates:
+            assignments = ", ".join(f"{column} = :{column}" for column in values)
+            conn.execute(text(f"UPDATE complaints SET {assignments} WHERE id = :id"), {"id": complaint_id, **values})
+        last_id = rows[-1]["id"]
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
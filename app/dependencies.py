@@ -1,16 +1,16 @@
 from typing import Generator, List
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 
-from .db import get_db
+from .db import get_async_db
 from .core.security import SECRET_KEY, ALGORITHM, oauth2_scheme
 from .models.user_model import TokenData
 from .models.sql_models import UserSQL
-from .services.auth_service import AuthService
+from .services.auth_service import AsyncAuthService
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> UserSQL:
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> UserSQL:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -25,8 +25,8 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     except JWTError:
         raise credentials_exception
     
-    auth_service = AuthService(db)
-    user = auth_service.get_user(email=token_data.email)
+    auth_service = AsyncAuthService(db)
+    user = await auth_service.get_user(email=token_data.email)
     if user is None:
         raise credentials_exception
     return user
@@ -1,18 +1,42 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
-from .api import complaints, documents, auth # Import auth router
-from .db import init_db
+from .api import analytics, complaints, dispatch, documents, auth, health # Import auth router
+from .db import init_db, engine, async_engine, SessionLocal
+from .services import pdf_extraction_service, circular_ingestion_service
+from .services.circular_search_service import CircularSearchService
+from .models.categorization_model import categorizer
+from .services.duplicate_detection_service import duplicate_detector
+from .services.dispatch_service import dispatch_queue
+from .services.reclassification_service import reclassification_follower
+from .ml import predict
 
 app = FastAPI()
 
 @app.on_event("startup")
 def on_startup():
     init_db() # Initialize database on startup
+    CircularSearchService.create_index(engine) # Full-text index over circulars, backfilled on first run
+    categorizer.load() # Load the complaint classifier before the first request needs it
+    reclassification_follower.start(SessionLocal) # Re-track complaints the reclassification job rewrites
+    with SessionLocal() as db:
+        duplicate_detector.load(db) # Index open complaints for near-duplicate detection
+        dispatch_queue.load(db) # Per-department dispatch heaps of pending complaints
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    circular_ingestion_service.shutdown_executor() # Stop accepting queued circular jobs
+    pdf_extraction_service.shutdown_executor() # Stop the PDF extraction worker pool
+    predict.shutdown() # Stop the inference micro-batcher
+    reclassification_follower.stop()
+    await async_engine.dispose() # Close the API's pooled async connections
 
 app.include_router(auth.router, prefix="/api/auth") # Include auth router
 app.include_router(complaints.router, prefix="/api")
 app.include_router(documents.router, prefix="/api")
+app.include_router(health.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
+app.include_router(dispatch.router, prefix="/api")
 
 # Serve static files from the "frontend" directory
 app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Callable, Dict
+
+from .models.sql_models import SchemaMigrationSQL
+
+# Data migrations, keyed by a permanent name ("0002_complaint_rollups") and run once per database in
+# name order, each in its own transaction. The module that owns the data registers its migration, so
+# the database layer never imports the services.
+DATA_MIGRATIONS: Dict[str, Callable] = {}
+
+
+def data_migration(name: str):
+    def register(migrate: Callable) -> Callable:
+        DATA_MIGRATIONS[name] = migrate
+        return migrate
+    return register
+
+
+def run_data_migrations(engine):
+    # Only migrations registered by modules imported so far run; the rest stay pending until a process
+    # that imports them starts (the API imports every service before startup)
+    migrations = SchemaMigrationSQL.__table__
+    for name in sorted(DATA_MIGRATIONS):
+        with engine.begin() as conn:
+            if conn.execute(migrations.select().where(migrations.c.name == name)).first():
+                continue
+            DATA_MIGRATIONS[name](conn)
+            conn.execute(migrations.insert().values(name=name, applied_at=datetime.utcnow()))
@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_STOP = object()
+
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesces concurrent single-item calls into batched calls of `fn`.
+
+    Callers submit one item and get a Future. A background thread takes the first waiting item,
+    keeps collecting for up to `max_wait_ms` or until `max_batch_size` items are queued, then
+    calls `fn` once for the whole batch. `fn` must return one result per item, in order.
+    """
+
+    def __init__(self, fn: Callable[[List[T]], List[R]], max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Tuple[T, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: T) -> "Future[R]":
+        self._ensure_started()
+        future: "Future[R]" = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: T) -> R:
+        return self.submit(item).result()
+
+    def stop(self):
+        with self._start_lock:
+            if self._thread is not None:
+                self._queue.put(_STOP)
+                self._thread.join(timeout=5)
+                self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self, first) -> List[Tuple[T, Future]]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                # Finish this batch first, then let the loop see the stop marker
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            # Requests cancelled while queued don't need a slot in the batch
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.fn([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
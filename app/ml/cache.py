@@ -0,0 +1,97 @@
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+class _FoldTable(dict):
+    # Punctuation and symbols fold to spaces, decided from the Unicode tables rather than using \W,
+    # which would also strip the combining vowel signs of Devanagari and other Indic scripts.
+    # Filled per code point on first sight, so importing the module costs nothing.
+    def __missing__(self, codepoint: int) -> str:
+        character = chr(codepoint)
+        folded = " " if unicodedata.category(character)[0] in "PS" else character
+        self[codepoint] = folded
+        return folded
+
+
+_FOLD = _FoldTable()
+
+
+def normalize_text(text: str) -> str:
+    # "Street light NOT working!!" and "street-light not working" share one cache entry
+    return " ".join(text.casefold().translate(_FOLD).split())
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a per-entry TTL, tied to one model version.
+
+    Entries are dropped wholesale the first time the cache is used with a different model
+    version, so a redeployed model never serves predictions from the previous one.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: Optional[str]):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: Hashable, version: Optional[str]):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value, version: Optional[str]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model_version": self._version,
+            }
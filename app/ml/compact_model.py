@@ -0,0 +1,361 @@
+"""
+Compact, memory-mappable complaint model format (.cdm).
+
+The TF-IDF vocabulary is stored as an open-addressing hash table over one UTF-8 blob, and the
+boosted trees as flat node arrays. Everything is loaded with mmap, so every uvicorn worker
+on a host shares the same page-cache pages and cold start is just parsing a small JSON header.
+
+Layout: b"CDCM" | uint32 format version | uint32 header length | JSON header | arrays
+(each array 64-byte aligned, described by offset/dtype/shape in the header).
+
+    python -m app.ml.compact_model            # export the deployed pickles to settings.compact_model_path
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import re
+import struct
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from ..config import settings
+
+MAGIC = b"CDCM"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<4sII")
+# Largest acceptable difference between compact and original probabilities when exporting
+EXPORT_TOLERANCE = 1e-4
+
+
+class UnsupportedModel(ValueError):
+    pass
+
+
+def _term_hash(term: bytes) -> int:
+    return zlib.crc32(term)
+
+
+def _build_hash_table(terms: List[bytes]) -> np.ndarray:
+    slots = 1
+    while slots < len(terms) * 2:
+        slots <<= 1
+    table = np.full(slots, -1, dtype=np.int32)
+    mask = slots - 1
+    for index, term in enumerate(terms):
+        slot = _term_hash(term) & mask
+        while table[slot] != -1:
+            slot = (slot + 1) & mask
+        table[slot] = index
+    return table
+
+
+def _export_vectorizer(tfidf) -> Tuple[dict, Dict[str, np.ndarray]]:
+    # Only the default word analyzer is re-implemented; anything custom stays on the pickle path
+    if (tfidf.analyzer != "word" or tfidf.preprocessor is not None or tfidf.tokenizer is not None
+            or tfidf.stop_words is not None or tfidf.strip_accents is not None or tfidf.binary
+            or not tfidf.use_idf or tfidf.norm not in ("l1", "l2", None)):
+        raise UnsupportedModel("vectorizer uses options the compact format does not implement")
+
+    terms = [None] * len(tfidf.vocabulary_)
+    for term, index in tfidf.vocabulary_.items():
+        terms[index] = term.encode("utf-8")
+    offsets = np.zeros(len(terms) + 1, dtype=np.uint32)
+    offsets[1:] = np.cumsum([len(term) for term in terms])
+
+    meta = {
+        "token_pattern": tfidf.token_pattern,
+        "lowercase": bool(tfidf.lowercase),
+        "ngram_range": list(tfidf.ngram_range),
+        "norm": tfidf.norm,
+        "sublinear_tf": bool(tfidf.sublinear_tf),
+        "n_features": len(terms),
+    }
+    arrays = {
+        "vocab_blob": np.frombuffer(b"".join(terms), dtype=np.uint8),
+        "vocab_offsets": offsets,
+        "vocab_table": _build_hash_table(terms),
+        "idf": tfidf.idf_.astype(np.float64),
+    }
+    return meta, arrays
+
+
+def _export_booster(clf) -> Tuple[dict, Dict[str, np.ndarray]]:
+    booster = clf.get_booster()
+    config = json.loads(booster.save_config())
+    objective = config["learner"]["objective"]["name"]
+    if objective not in ("multi:softprob", "multi:softmax", "binary:logistic"):
+        raise UnsupportedModel(f"objective {objective} is not supported")
+    tree_info = json.loads(booster.save_raw("json"))["learner"]["gradient_booster"]["model"]["tree_info"]
+
+    features, thresholds, lefts, rights, missings, values, roots = [], [], [], [], [], [], []
+    for tree_json in booster.get_dump(dump_format="json"):
+        root = json.loads(tree_json)
+        offset = len(features)
+        roots.append(offset)
+        # Flatten breadth-first; xgboost node ids are dense per tree so offset + nodeid is the slot
+        nodes = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            nodes[node["nodeid"]] = node
+            stack.extend(node.get("children", []))
+        for node_id in range(len(nodes)):
+            node = nodes[node_id]
+            if "leaf" in node:
+                features.append(-1)
+                thresholds.append(0.0)
+                lefts.append(offset + node_id)
+                rights.append(offset + node_id)
+                missings.append(offset + node_id)
+                values.append(node["leaf"])
+            else:
+                features.append(int(str(node["split"]).lstrip("f")))
+                thresholds.append(node["split_condition"])
+                lefts.append(offset + node["yes"])
+                rights.append(offset + node["no"])
+                missings.append(offset + node["missing"])
+                values.append(0.0)
+
+    num_class = 1 if objective == "binary:logistic" else int(config["learner"]["learner_model_param"]["num_class"])
+    meta = {"objective": objective, "num_class": num_class, "max_depth": 0}
+    arrays = {
+        "node_feature": np.array(features, dtype=np.int32),
+        "node_threshold": np.array(thresholds, dtype=np.float32),
+        "node_left": np.array(lefts, dtype=np.int32),
+        "node_right": np.array(rights, dtype=np.int32),
+        "node_missing": np.array(missings, dtype=np.int32),
+        "node_value": np.array(values, dtype=np.float32),
+        "tree_roots": np.array(roots, dtype=np.int32),
+        "tree_class": np.array(tree_info, dtype=np.int32),
+    }
+    meta["max_depth"] = _max_depth(arrays)
+    return meta, arrays
+
+
+def _max_depth(arrays: Dict[str, np.ndarray]) -> int:
+    depth = 0
+    nodes = arrays["tree_roots"].copy()
+    while True:
+        internal = arrays["node_feature"][nodes] >= 0
+        if not internal.any():
+            return depth
+        nodes = np.concatenate([arrays["node_left"][nodes[internal]], arrays["node_right"][nodes[internal]]])
+        depth += 1
+
+
+def export_compact(tfidf, clf, path: str, sample_texts: List[str]) -> str:
+    """Write tfidf + clf to `path`, checking predictions against the originals on sample_texts."""
+    vectorizer_meta, arrays = _export_vectorizer(tfidf)
+    booster_meta, booster_arrays = _export_booster(clf)
+    arrays.update(booster_arrays)
+    labels = list(getattr(clf, "category_labels_", None) or clf.classes_.tolist())
+    header = {
+        "labels": [str(label) if not isinstance(label, (int, float)) else label for label in labels],
+        "vectorizer": vectorizer_meta,
+        "booster": booster_meta,
+        "base_margin": [0.0] * booster_meta["num_class"],
+    }
+
+    # xgboost's intercept (base_score) isn't part of the tree dump; recover it from the margins
+    X = tfidf.transform(sample_texts)
+    expected_margin = np.asarray(clf.get_booster().predict(_dmatrix(X), output_margin=True), dtype=np.float64)
+    expected_margin = expected_margin.reshape(len(sample_texts), -1)
+    model = CompactModel(header, arrays)
+    leaf_sums = model.classifier.leaf_sums(X)
+    header["base_margin"] = np.median(expected_margin - leaf_sums, axis=0).tolist()
+    model = CompactModel(header, arrays)
+
+    expected = clf.predict_proba(X)
+    actual = model.classifier.predict_proba(model.vectorizer.transform(sample_texts))
+    if np.max(np.abs(expected - actual)) > EXPORT_TOLERANCE:
+        raise UnsupportedModel("compact model predictions diverge from the original model")
+
+    header["version"] = hashlib.sha256(json.dumps(header, sort_keys=True).encode()
+                                       + b"".join(a.tobytes() for a in arrays.values())).hexdigest()[:12]
+    _write(path, header, arrays)
+    return header["version"]
+
+
+def _dmatrix(X):
+    import xgboost
+    return xgboost.DMatrix(X)
+
+
+def _write(path: str, header: dict, arrays: Dict[str, np.ndarray]):
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset += array.nbytes
+    header = {**header, "arrays": layout}
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = -(-(_PREFIX.size + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    with open(path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+class CompactVectorizer:
+    def __init__(self, meta: dict, arrays: Dict[str, np.ndarray]):
+        self.token_pattern = re.compile(meta["token_pattern"])
+        self.lowercase = meta["lowercase"]
+        self.min_n, self.max_n = meta["ngram_range"]
+        self.norm = meta["norm"]
+        self.sublinear_tf = meta["sublinear_tf"]
+        self.n_features = meta["n_features"]
+        self.blob = arrays["vocab_blob"]
+        self.offsets = arrays["vocab_offsets"]
+        self.table = arrays["vocab_table"]
+        self.mask = len(self.table) - 1
+        self.idf = arrays["idf"]
+
+    def lookup(self, term: str) -> int:
+        encoded = term.encode("utf-8")
+        slot = _term_hash(encoded) & self.mask
+        while True:
+            index = int(self.table[slot])
+            if index < 0:
+                return -1
+            if self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes() == encoded:
+                return index
+            slot = (slot + 1) & self.mask
+
+    def _ngrams(self, text: str) -> List[str]:
+        # Same analysis as sklearn's default word analyzer
+        tokens = self.token_pattern.findall(text.lower() if self.lowercase else text)
+        grams = list(tokens) if self.min_n == 1 else []
+        for n in range(max(self.min_n, 2), self.max_n + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        # CSR built from (row, column) index lists, like sklearn's own transform; each distinct n-gram
+        # of the batch is looked up in the mapped hash table once
+        rows, columns = [], []
+        term_indices: Dict[str, int] = {}
+        for row, text in enumerate(texts):
+            for gram in self._ngrams(text):
+                index = term_indices.get(gram)
+                if index is None:
+                    index = term_indices[gram] = self.lookup(gram)
+                if index >= 0:
+                    rows.append(row)
+                    columns.append(index)
+        # Accumulate in float64 and round once at the end, exactly like sklearn followed by xgboost's
+        # float32 cast; split thresholds are training values, so an extra rounding step flips branches
+        X = sparse.csr_matrix(
+            (np.ones(len(rows)), (np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64))),
+            shape=(len(texts), self.n_features)
+        ) # duplicate (row, column) pairs are summed into term counts
+        X.sum_duplicates()
+        if self.sublinear_tf:
+            X.data = np.log(X.data) + 1
+        X.data *= self.idf[X.indices]
+        if self.norm == "l2":
+            norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        elif self.norm == "l1":
+            norms = np.asarray(abs(X).sum(axis=1)).ravel()
+        else:
+            return X.astype(np.float32)
+        norms[norms == 0] = 1
+        X.data /= np.repeat(norms, np.diff(X.indptr))
+        return X.astype(np.float32)
+
+
+class CompactBooster:
+    def __init__(self, header: dict, arrays: Dict[str, np.ndarray]):
+        meta = header["booster"]
+        self.objective = meta["objective"]
+        self.num_class = meta["num_class"]
+        self.max_depth = meta["max_depth"]
+        self.base_margin = np.array(header["base_margin"], dtype=np.float64)
+        self.classes_ = np.array(header["labels"])
+        self.feature = arrays["node_feature"]
+        self.threshold = arrays["node_threshold"]
+        self.left = arrays["node_left"]
+        self.right = arrays["node_right"]
+        self.missing = arrays["node_missing"]
+        self.value = arrays["node_value"]
+        self.roots = arrays["tree_roots"]
+        self.tree_class = arrays["tree_class"]
+        # Derived once per process; these are small and the mapped arrays stay untouched
+        self.split_features = np.unique(self.feature[self.feature >= 0])
+        # Node -> column of the densified split features (leaves never read theirs)
+        self.node_column = np.searchsorted(self.split_features, np.maximum(self.feature, 0)).astype(np.int64)
+        self.node_column[self.feature < 0] = 0
+        self.class_matrix = np.zeros((len(self.roots), self.num_class))
+        self.class_matrix[np.arange(len(self.roots)), self.tree_class] = 1
+
+    def leaf_sums(self, X) -> np.ndarray:
+        # Walk every tree for every row at once, one depth level per iteration. Leaves point back at
+        # themselves, so rows that reach a leaf early just stay put. Only the columns some split reads
+        # are densified (a few hundred of the vocabulary), so the batch never becomes rows x n_features.
+        X = sparse.csr_matrix(X, dtype=np.float32)[:, self.split_features].toarray()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        X = X.ravel()
+        nodes = np.broadcast_to(self.roots, (len(row_offsets), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = X.take(row_offsets + self.node_column.take(nodes))
+            # Absent sparse entries are "missing" to xgboost; TF-IDF never stores explicit zeros
+            nodes = np.where(x == 0, self.missing.take(nodes),
+                             np.where(x < self.threshold.take(nodes), self.left.take(nodes), self.right.take(nodes)))
+        return self.value.take(nodes).astype(np.float64) @ self.class_matrix
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        margin = self.leaf_sums(X) + self.base_margin
+        if self.objective == "binary:logistic":
+            positive = 1 / (1 + np.exp(-margin[:, 0]))
+            return np.column_stack([1 - positive, positive])
+        margin -= margin.max(axis=1, keepdims=True)
+        exp = np.exp(margin)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+class CompactModel:
+    def __init__(self, header: dict, arrays: Dict[str, np.ndarray], mapped: mmap.mmap = None):
+        self.header = header
+        self.version = header.get("version")
+        self.vectorizer = CompactVectorizer(header["vectorizer"], arrays)
+        self.classifier = CompactBooster(header, arrays)
+        self._mapped = mapped # keeps the mapping alive as long as the arrays reference it
+
+    @classmethod
+    def load(cls, path: str) -> "CompactModel":
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = _PREFIX.unpack_from(mapped, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise UnsupportedModel(f"{path} is not a version {FORMAT_VERSION} compact model")
+        header = json.loads(mapped[_PREFIX.size:_PREFIX.size + header_length])
+        data_start = -(-(_PREFIX.size + header_length) // ALIGNMENT) * ALIGNMENT
+        arrays = {
+            name: np.frombuffer(mapped, dtype=np.dtype(spec["dtype"]), count=int(np.prod(spec["shape"])),
+                                offset=data_start + spec["offset"]).reshape(spec["shape"])
+            for name, spec in header["arrays"].items()
+        }
+        return cls(header, arrays, mapped)
+
+
+if __name__ == '__main__':
+    import joblib
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=settings.model_path)
+    parser.add_argument('--tfidf', default=settings.tfidf_path)
+    parser.add_argument('--out', default=settings.compact_model_path)
+    parser.add_argument('--samples', required=True, help="CSV with a text column used to verify the export")
+    args = parser.parse_args()
+
+    import pandas as pd
+    samples = pd.read_csv(args.samples, nrows=500)['text'].fillna("").tolist()
+    version = export_compact(joblib.load(args.tfidf), joblib.load(args.model), args.out, samples)
+    print(f"Exported compact model {version} to {args.out}")
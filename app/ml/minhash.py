@@ -0,0 +1,130 @@
+import threading
+import zlib
+from collections import defaultdict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+import numpy as np
+
+from .cache import normalize_text
+
+# Signature layout is persisted (complaints.minhash); changing any of these invalidates stored signatures
+NUM_PERMUTATIONS = 64
+SHINGLE_SIZE = 4 # characters; short complaint texts need character shingles to survive typos and rewording
+MINHASH_SEED = 20240601
+# 16 bands x 4 rows: pairs at Jaccard 0.75 become candidates 99.8% of the time, at 0.6 89%, at 0.3 12%
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+
+class MinHasher:
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, seed: int = MINHASH_SEED):
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family: h(x) = (a * x + b) >> 32 over uint64, with a odd
+        self.a = rng.integers(1, 2 ** 63, size=num_permutations, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_permutations, dtype=np.uint64)
+
+    @staticmethod
+    def shingles(text: str) -> np.ndarray:
+        text = normalize_text(text)
+        if len(text) <= SHINGLE_SIZE:
+            grams = {text}
+        else:
+            grams = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+        return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = (self.a * self.shingles(text)[:, None] + self.b) >> np.uint64(32)
+        return hashes.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(left: np.ndarray, right: np.ndarray) -> float:
+        # Fraction of matching minimums is an unbiased estimate of the shingle-set Jaccard similarity
+        return float(np.count_nonzero(left == right)) / len(left)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures, partitioned (e.g. by category).
+
+    A query only compares against entries sharing at least one band bucket, so lookups cost
+    O(bands + candidates) however many signatures are indexed. Signatures live in one matrix
+    so the candidates are scored in a single vectorized comparison. Thread-safe.
+    """
+
+    def __init__(self, bands: int = LSH_BANDS, rows: int = LSH_ROWS):
+        self.bands = bands
+        self.rows = rows
+        self._buckets: Dict[tuple, Set[int]] = defaultdict(set) # band key -> slots
+        self._slots: Dict[Hashable, int] = {}
+        self._slot_entries: list = [] # slot -> (key, partition), None when free
+        self._free_slots: list = []
+        self._matrix = np.zeros((1024, bands * rows), dtype=np.uint32)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _band_keys(self, partition: Hashable, signature: np.ndarray):
+        return [
+            (partition, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: Hashable, partition: Hashable, signature: np.ndarray):
+        with self._lock:
+            self._remove(key)
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._slot_entries[slot] = (key, partition)
+            else:
+                slot = len(self._slot_entries)
+                self._slot_entries.append((key, partition))
+                if slot == len(self._matrix):
+                    self._matrix = np.concatenate([self._matrix, np.zeros_like(self._matrix)])
+            self._matrix[slot] = signature
+            self._slots[key] = slot
+            for band_key in self._band_keys(partition, signature):
+                self._buckets[band_key].add(slot)
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: Hashable):
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        _, partition = self._slot_entries[slot]
+        for band_key in self._band_keys(partition, self._matrix[slot]):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(slot)
+                if not bucket:
+                    del self._buckets[band_key]
+        self._slot_entries[slot] = None
+        self._free_slots.append(slot)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._slots.clear()
+            self._slot_entries.clear()
+            self._free_slots.clear()
+
+    def query(self, partition: Hashable, signature: np.ndarray, threshold: float) -> Optional[Tuple[Hashable, float]]:
+        # Best-matching indexed key at or above threshold (lowest key on ties), or None
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(partition, signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            if not candidates:
+                return None
+            slots = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+            similarities = np.count_nonzero(self._matrix[slots] == signature, axis=1) / len(signature)
+            matches = [
+                (similarity, self._slot_entries[slot][0])
+                for slot, similarity in zip(slots[similarities >= threshold], similarities[similarities >= threshold])
+            ]
+        if not matches:
+            return None
+        similarity, key = min(matches, key=lambda match: (-match[0], match[1]))
+        return key, float(similarity)
@@ -0,0 +1,174 @@
+"""
+Grid search over vectorizer and booster settings, scored on accuracy *and* serving cost.
+
+Candidates are fitted in parallel, one per process. Latency is measured afterwards, one candidate
+at a time, so timings aren't skewed by the other fits competing for cores.
+"""
+import itertools
+import json
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import joblib
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+from xgboost import XGBClassifier
+
+from ..config import settings
+from .compact_model import CompactModel, UnsupportedModel, export_compact
+
+DEFAULT_GRID = {
+    "vectorizer": {"max_features": [5000, 10000, 20000], "ngram_range": [[1, 1], [1, 2]]},
+    "booster": {"n_estimators": [50, 100], "max_depth": [4, 6]},
+}
+LATENCY_TEXTS = 1000
+
+# Loaded once per worker process by _init_worker
+_data = {}
+
+
+def expand_grid(grid: Dict) -> List[Dict]:
+    def product(space: Dict) -> List[Dict]:
+        keys = sorted(space)
+        return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+    return [{"vectorizer": v, "booster": b} for v in product(grid["vectorizer"]) for b in product(grid["booster"])]
+
+
+def _split(data_csv: str):
+    df = pd.read_csv(data_csv, usecols=['text', 'category'])
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(df['category'])
+    X_train, X_val, y_train, y_val = train_test_split(
+        df['text'].fillna("").tolist(), y, test_size=0.2, random_state=42
+    )
+    return X_train, X_val, y_train, y_val, encoder.classes_.tolist()
+
+
+def _init_worker(data_csv: str):
+    _data["split"] = _split(data_csv)
+
+
+def _fit_candidate(config: Dict) -> Dict:
+    X_train, X_val, y_train, y_val, labels = _data["split"]
+    started = time.perf_counter()
+    vectorizer = config["vectorizer"]
+    tfidf = TfidfVectorizer(max_features=vectorizer["max_features"], ngram_range=tuple(vectorizer["ngram_range"]))
+    Xv = tfidf.fit_transform(X_train)
+    # One thread per fit: the pool already uses every core
+    clf = XGBClassifier(eval_metric='mlogloss', n_jobs=1, **config["booster"])
+    clf.fit(Xv, y_train)
+    clf.category_labels_ = labels
+    fit_seconds = time.perf_counter() - started
+
+    preds = clf.predict(tfidf.transform(X_val))
+    return {
+        "config": config,
+        "accuracy": round(float(accuracy_score(y_val, preds)), 4),
+        "macro_f1": round(float(f1_score(y_val, preds, average="macro")), 4),
+        "fit_seconds": round(fit_seconds, 2),
+        "model": pickle.dumps((tfidf, clf)),
+    }
+
+
+def _latency_ms_per_1k(vectorizer, classifier, texts: List[str], batch_size: int) -> float:
+    # Same shape of work as the API: micro-batches of up to batch_size complaints
+    started = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        classifier.predict_proba(vectorizer.transform(texts[i:i + batch_size]))
+    return round((time.perf_counter() - started) * 1000 * 1000 / len(texts), 2)
+
+
+def _pickle_size(tfidf, clf, workdir: str) -> int:
+    # Size as train.py would write it, i.e. both joblib pickles
+    size = 0
+    for name, obj in (("classifier.pkl", clf), ("tfidf.pkl", tfidf)):
+        path = os.path.join(workdir, name)
+        joblib.dump(obj, path)
+        size += os.path.getsize(path)
+    return size
+
+
+def _measure(result: Dict, texts: List[str], samples: List[str], batch_size: int, workdir: str) -> Dict:
+    model = result.pop("model")
+    tfidf, clf = pickle.loads(model)
+    clf.set_params(n_jobs=1)
+
+    # Python-heap cost of the unpickled vectorizer plus the booster's serialized tree size
+    tracemalloc.start()
+    pickle.loads(model)
+    heap_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    tree_bytes = len(clf.get_booster().save_raw("ubj"))
+
+    measured = {
+        "latency_ms_per_1k": _latency_ms_per_1k(tfidf, clf, texts, batch_size),
+        "pickle_bytes": _pickle_size(tfidf, clf, workdir),
+        "memory_bytes": heap_bytes + tree_bytes,
+    }
+    try:
+        path = os.path.join(workdir, "candidate.cdm")
+        export_compact(tfidf, clf, path, samples)
+        compact = CompactModel.load(path)
+        measured.update(
+            compact_latency_ms_per_1k=_latency_ms_per_1k(compact.vectorizer, compact.classifier, texts, batch_size),
+            compact_bytes=os.path.getsize(path),
+        )
+    except UnsupportedModel as e:
+        measured.update(compact_latency_ms_per_1k=None, compact_bytes=None, compact_error=str(e))
+    result.update(measured)
+    return result
+
+
+def serving_latency(result: Dict) -> Optional[float]:
+    # Workers serve the compact model when one could be exported
+    return result.get("compact_latency_ms_per_1k") or result["latency_ms_per_1k"]
+
+
+def run_selection(data_csv: str, grid: Dict = None, workers: Optional[int] = None,
+                  latency_budget_ms: Optional[float] = None) -> Dict:
+    configs = expand_grid(grid or DEFAULT_GRID)
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_csv,)) as pool:
+        futures = [pool.submit(_fit_candidate, config) for config in configs]
+        for done, future in enumerate(as_completed(futures), start=1):
+            results.append(future.result())
+            print(f"fitted {done}/{len(configs)}: {results[-1]['config']} accuracy={results[-1]['accuracy']}")
+
+    _, X_val, _, _, labels = _split(data_csv)
+    texts = list(itertools.islice(itertools.cycle(X_val), LATENCY_TEXTS))
+    with tempfile.TemporaryDirectory(prefix="civicdoc-select-") as workdir:
+        results = [_measure(result, texts, X_val[:500], settings.inference_max_batch_size, workdir)
+                   for result in results]
+
+    for result in results:
+        result["within_budget"] = latency_budget_ms is None or serving_latency(result) <= latency_budget_ms
+    results.sort(key=lambda r: (not r["within_budget"], -r["accuracy"], serving_latency(r)))
+    selected = results[0] if results and results[0]["within_budget"] else None
+    return {
+        "data": data_csv,
+        "labels": labels,
+        "validation_rows": len(X_val),
+        "latency_budget_ms_per_1k": latency_budget_ms,
+        "batch_size": settings.inference_max_batch_size,
+        "candidates": len(results),
+        "total_seconds": round(time.perf_counter() - started, 2),
+        "selected": selected["config"] if selected else None,
+        "results": results,
+    }
+
+
+def write_report(report: Dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
@@ -1,29 +1,118 @@
+import hashlib
+import logging
+import os
 import joblib
-from typing import Dict
-from .config import settings
+import numpy as np
+from typing import Dict, List, Optional
+from ..config import settings
+from .batching import MicroBatcher
+from .cache import PredictionCache, normalize_text
+from .compact_model import CompactModel
 
+logger = logging.getLogger(__name__)
 
 clf = None
 tfidf = None
+labels: Optional[List] = None
+# Short content hash of the loaded model files, reported by readiness checks
+model_version: Optional[str] = None
+
+
+
+
+def _file_digest(*paths: str) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+
+
+def _load_compact() -> bool:
+    global clf, tfidf, labels, model_version
+    if not os.path.exists(settings.compact_model_path):
+        return False
+    try:
+        model = CompactModel.load(settings.compact_model_path)
+    except Exception as e:
+        logger.warning("Compact model %s unusable, falling back to pickles: %s", settings.compact_model_path, e)
+        return False
+    # Arrays are views over a shared read-only mapping, so every worker uses the same pages
+    clf, tfidf = model.classifier, model.vectorizer
+    labels = model.classifier.classes_.tolist()
+    model_version = model.version
+    return True
 
 
 
 
 def load():
-global clf, tfidf
-if clf is None:
-clf = joblib.load(settings.model_path)
-if tfidf is None:
-tfidf = joblib.load(settings.tfidf_path)
+    global clf, tfidf, labels, model_version
+    if is_loaded() or _load_compact():
+        return
+    clf = joblib.load(settings.model_path)
+    tfidf = joblib.load(settings.tfidf_path)
+    labels = list(getattr(clf, "category_labels_", None) or clf.classes_.tolist())
+    model_version = _file_digest(settings.model_path, settings.tfidf_path)
+
+
+
+
+def is_loaded() -> bool:
+    return clf is not None and tfidf is not None
+
+
+
+
+def predict_batch(texts: List[str]) -> List[Dict]:
+    # One sparse matrix and a single predict_proba for the whole batch; the predicted class is
+    # the argmax of those probabilities rather than a second pass through the booster
+    load()
+    X = tfidf.transform(texts)
+    probs = clf.predict_proba(X)
+    best = np.argmax(probs, axis=1)
+    return [
+        {"category": labels[best[row]], "probs": {labels[i]: float(probs[row, i]) for i in range(len(labels))}}
+        for row in range(len(texts))
+    ]
+
+
+
+
+# Concurrent single-complaint calls are coalesced into predict_batch calls
+_batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=settings.inference_max_batch_size,
+    max_wait_ms=settings.inference_max_wait_ms
+)
+
+
+
+
+# Repeat reports of the same problem skip the model entirely; keyed on normalized text and
+# emptied automatically whenever a different model version is loaded
+prediction_cache = PredictionCache(
+    max_entries=settings.prediction_cache_size,
+    ttl_seconds=settings.prediction_cache_ttl_seconds
+)
 
 
 
 
 def predict(text: str) -> Dict:
-load()
-X = tfidf.transform([text])
-pred = clf.predict(X)[0]
-probs = clf.predict_proba(X)[0]
-labels = clf.classes_.tolist()
-prob_map = {labels[i]: float(probs[i]) for i in range(len(labels))}
-return {"category": pred, "probs": prob_map}
\ No newline at end of file
+    load()
+    key = normalize_text(text)
+    result = prediction_cache.get(key, model_version)
+    if result is None:
+        result = _batcher(text)
+        prediction_cache.put(key, result, model_version)
+    return {"category": result["category"], "probs": dict(result["probs"])}
+
+
+
+
+def shutdown():
+    _batcher.stop()
@@ -0,0 +1,187 @@
+"""
+Out-of-core training for complaint corpora that don't fit in memory.
+
+Pass 1 streams the CSV once to count n-gram frequencies and build the TF-IDF vocabulary; pass 2
+streams it again through an xgboost DataIter so the training matrix is paged to disk instead of
+held in RAM. Only one chunk of raw text is in memory at a time.
+"""
+import resource
+import shutil
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xgboost
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import classification_report
+from xgboost import XGBClassifier
+
+CHUNK_ROWS = 50000
+MAX_FEATURES = 10000
+NGRAM_RANGE = (1, 2)
+# Pass 1 prunes its counters whenever they track more terms than this (lossy counting)
+MAX_TRACKED_TERMS = 2000000
+# Every Nth row is held out for evaluation, up to VALIDATION_ROWS rows
+HOLDOUT_EVERY = 10
+VALIDATION_ROWS = 20000
+BOOST_ROUNDS = 100
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _chunks(data_csv: str, chunksize: int):
+    for chunk in pd.read_csv(data_csv, usecols=['text', 'category'], chunksize=chunksize):
+        yield chunk['text'].fillna("").tolist(), chunk['category'].tolist()
+
+
+def build_vectorizer(data_csv: str, chunksize: int = CHUNK_ROWS, max_features: int = MAX_FEATURES,
+                     stats: Optional[Dict] = None) -> Tuple[TfidfVectorizer, List]:
+    """Pass 1: the same vocabulary and idf weights TfidfVectorizer.fit would produce, from counts."""
+    analyzer = TfidfVectorizer(ngram_range=NGRAM_RANGE).build_analyzer()
+    term_counts, doc_counts = Counter(), Counter()
+    categories = set()
+    n_docs = 0
+    prune_floor = 0
+    started = time.perf_counter()
+
+    for texts, labels in _chunks(data_csv, chunksize):
+        categories.update(labels)
+        for text in texts:
+            grams = analyzer(text)
+            term_counts.update(grams)
+            doc_counts.update(set(grams))
+        n_docs += len(texts)
+        if len(doc_counts) > MAX_TRACKED_TERMS:
+            # Rare terms can't make the top max_features anyway; dropping them keeps memory bounded
+            # at the cost of slightly undercounting terms that were pruned and then reappeared
+            prune_floor += 1
+            for term in [term for term, count in doc_counts.items() if count <= prune_floor]:
+                del doc_counts[term]
+                del term_counts[term]
+
+    # sklearn keeps the most frequent terms corpus-wide, then numbers them alphabetically
+    kept = sorted(term for term, _ in term_counts.most_common(max_features))
+    tfidf = TfidfVectorizer(ngram_range=NGRAM_RANGE, vocabulary={term: i for i, term in enumerate(kept)})
+    df = np.array([doc_counts[term] for term in kept], dtype=np.float64)
+    tfidf.idf_ = np.log((1 + n_docs) / (1 + df)) + 1
+
+    if stats is not None:
+        elapsed = time.perf_counter() - started
+        stats["vocabulary"] = {"rows": n_docs, "seconds": round(elapsed, 2),
+                               "rows_per_sec": round(n_docs / elapsed) if elapsed else None,
+                               "features": len(kept), "prune_floor": prune_floor}
+    return tfidf, sorted(categories, key=str)
+
+
+class _ComplaintChunks(xgboost.DataIter):
+    """Feeds one vectorized chunk at a time to xgboost, holding out every HOLDOUT_EVERY-th row."""
+
+    def __init__(self, data_csv: str, chunksize: int, tfidf: TfidfVectorizer, labels: List, cache_prefix: str):
+        self.data_csv = data_csv
+        self.chunksize = chunksize
+        self.tfidf = tfidf
+        self.label_index = {label: i for i, label in enumerate(labels)}
+        self.validation_texts: List[str] = []
+        self.validation_labels: List[int] = []
+        self.rows = 0
+        self.skipped = 0
+        # xgboost may iterate more than once; counters and the holdout only fill on the first pass
+        self._seen_all = False
+        self._reader = None
+        self._offset = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._reader = None
+
+    def next(self, input_data) -> bool:
+        if self._reader is None:
+            self._reader = _chunks(self.data_csv, self.chunksize)
+            self._offset = 0
+        for texts, labels in self._reader:
+            first_pass = not self._seen_all
+            keep_texts, keep_labels = [], []
+            for row, (text, label) in enumerate(zip(texts, labels), start=self._offset):
+                index = self.label_index.get(label)
+                if index is None:
+                    # Warm starts can't add classes; rows from new categories need a full retrain
+                    self.skipped += first_pass
+                elif row % HOLDOUT_EVERY == 0:
+                    if first_pass and len(self.validation_texts) < VALIDATION_ROWS:
+                        self.validation_texts.append(text)
+                        self.validation_labels.append(index)
+                else:
+                    keep_texts.append(text)
+                    keep_labels.append(index)
+            self._offset += len(texts)
+            self.rows += len(keep_texts) if first_pass else 0
+            if keep_texts:
+                input_data(data=self.tfidf.transform(keep_texts), label=np.array(keep_labels))
+                return True
+        self._seen_all = True
+        return False
+
+
+def train_streaming(data_csv: str, chunksize: int = CHUNK_ROWS, rounds: int = BOOST_ROUNDS,
+                    warm_start: Optional[tuple] = None) -> Tuple[TfidfVectorizer, XGBClassifier, List[str], Dict]:
+    """Returns (tfidf, clf, sample_texts, stats). warm_start is the deployed (tfidf, clf) pair."""
+    stats: Dict = {}
+    started = time.perf_counter()
+
+    if warm_start:
+        # Keep the deployed feature space and classes so the existing trees stay meaningful
+        tfidf, base_clf = warm_start
+        labels = list(getattr(base_clf, "category_labels_", None) or base_clf.classes_.tolist())
+        base_booster = base_clf.get_booster()
+    else:
+        tfidf, labels = build_vectorizer(data_csv, chunksize, stats=stats)
+        base_booster = None
+
+    params = {"tree_method": "hist", "eval_metric": "mlogloss"}
+    if len(labels) > 2:
+        params.update(objective="multi:softprob", num_class=len(labels))
+    else:
+        params.update(objective="binary:logistic", eval_metric="logloss")
+
+    cache_dir = tempfile.mkdtemp(prefix="civicdoc-train-")
+    try:
+        chunks = _ComplaintChunks(data_csv, chunksize, tfidf, labels, cache_prefix=f"{cache_dir}/train")
+        pass_started = time.perf_counter()
+        dtrain = xgboost.ExtMemQuantileDMatrix(chunks)
+        ingest_seconds = time.perf_counter() - pass_started
+        dval = xgboost.DMatrix(tfidf.transform(chunks.validation_texts), label=chunks.validation_labels)
+
+        pass_started = time.perf_counter()
+        booster = xgboost.train(params, dtrain, num_boost_round=rounds, xgb_model=base_booster,
+                                evals=[(dval, "holdout")], verbose_eval=max(1, rounds // 10))
+        train_seconds = time.perf_counter() - pass_started
+        # Release the matrix before its page files are removed
+        del dtrain
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    clf = XGBClassifier()
+    clf.load_model(bytearray(booster.save_raw("ubj")))
+    clf.category_labels_ = labels
+
+    probs = booster.predict(dval)
+    preds = np.argmax(probs, axis=1) if probs.ndim == 2 else (probs > 0.5).astype(int)
+    print(classification_report(chunks.validation_labels, preds, labels=list(range(len(labels))),
+                                target_names=[str(label) for label in labels], zero_division=0))
+
+    stats["matrix"] = {"rows": chunks.rows, "seconds": round(ingest_seconds, 2),
+                       "rows_per_sec": round(chunks.rows / ingest_seconds) if ingest_seconds else None,
+                       "skipped_unknown_category": chunks.skipped}
+    stats["boosting"] = {"rounds": rounds, "total_rounds": booster.num_boosted_rounds(),
+                         "seconds": round(train_seconds, 2),
+                         "row_rounds_per_sec": round(chunks.rows * rounds / train_seconds) if train_seconds else None}
+    stats["holdout_rows"] = len(chunks.validation_labels)
+    stats["total_seconds"] = round(time.perf_counter() - started, 2)
+    stats["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return tfidf, clf, chunks.validation_texts[:500], stats
@@ -1,52 +1,123 @@
 """
 Train a simple TF-IDF + XGBoost classifier for complaint category.
 This script expects a CSV with columns: text, category, urgency (0/1), severity (0-10)
+
+    python -m app.ml.train --data complaints.csv
+    python -m app.ml.train --data history.csv --stream [--chunksize 50000] [--warm-start]
+    python -m app.ml.train select --data complaints.csv [--grid grid.json] [--latency-budget-ms 50]
+
+--stream trains out of core for corpora larger than RAM; --warm-start adds trees to the deployed
+model using its vocabulary and categories instead of starting over. `select` fits a grid of
+vectorizer/booster settings across all cores and writes a JSON report of accuracy, latency per
+1k complaints and model size, ranking models that fit the latency budget first.
 """
 import argparse
+import json
 import joblib
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
 from xgboost import XGBClassifier
-from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report
 from pathlib import Path
 
 
 from app.config import settings
+from app.ml.compact_model import UnsupportedModel, export_compact
+from app.ml.model_selection import run_selection, write_report
+from app.ml.streaming_train import BOOST_ROUNDS, CHUNK_ROWS, train_streaming
 
 
 
 
 def main(data_csv):
-df = pd.read_csv(data_csv)
-X = df['text'].fillna("")
-y = df['category']
+    df = pd.read_csv(data_csv)
+    X = df['text'].fillna("")
+    # xgboost only accepts 0..n-1 class ids; the category names travel on the model instead
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(df['category'])
+
+
+    tfidf = TfidfVectorizer(max_features=10000, ngram_range=(1,2))
+    Xv = tfidf.fit_transform(X)
+
+
+    X_train, X_val, y_train, y_val = train_test_split(Xv, y, test_size=0.2, random_state=42)
+    clf = XGBClassifier(eval_metric='mlogloss')
+    clf.fit(X_train, y_train)
+    clf.category_labels_ = encoder.classes_.tolist()
+
+
+    preds = clf.predict(X_val)
+    print(classification_report(y_val, preds, target_names=[str(label) for label in encoder.classes_]))
+    save(tfidf, clf, X.iloc[:500].tolist())
+
+
+
+
+def main_streaming(data_csv, chunksize, rounds, warm_start):
+    deployed = (joblib.load(settings.tfidf_path), joblib.load(settings.model_path)) if warm_start else None
+    tfidf, clf, samples, stats = train_streaming(data_csv, chunksize, rounds, deployed)
+    save(tfidf, clf, samples)
+    print(json.dumps(stats, indent=2))
+
 
 
-tfidf = TfidfVectorizer(max_features=10000, ngram_range=(1,2))
-Xv = tfidf.fit_transform(X)
 
+def main_select(data_csv, grid_path, workers, latency_budget_ms, report_path):
+    grid = None
+    if grid_path:
+        with open(grid_path) as f:
+            grid = json.load(f)
+    report = run_selection(data_csv, grid, workers, latency_budget_ms)
+    write_report(report, report_path)
+    for result in report["results"]:
+        print(f"{'*' if result['config'] == report['selected'] else ' '} acc={result['accuracy']:.4f} "
+              f"latency/1k={result['latency_ms_per_1k']}ms compact/1k={result['compact_latency_ms_per_1k']}ms "
+              f"disk={result['pickle_bytes']} {result['config']}")
+    print(f"Wrote {report_path}")
 
-X_train, X_val, y_train, y_val = train_test_split(Xv, y, test_size=0.2, random_state=42)
-clf = XGBClassifier(use_label_encoder=False, eval_metric='mlogloss')
-clf.fit(X_train, y_train)
 
 
-preds = clf.predict(X_val)
-print(classification_report(y_val, preds))
 
+def save(tfidf, clf, samples):
+    Path(settings.model_path).parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(clf, settings.model_path)
+    joblib.dump(tfidf, settings.tfidf_path)
+    print("Saved model and tfidf")
 
-Path(settings.model_path).parent.mkdir(parents=True, exist_ok=True)
-joblib.dump(clf, settings.model_path)
-joblib.dump(tfidf, settings.tfidf_path)
-print("Saved model and tfidf")
+    # The pickles stay the source of truth; the compact file is what the API workers mmap
+    try:
+        version = export_compact(tfidf, clf, settings.compact_model_path, samples)
+        print(f"Saved compact model {version}")
+    except UnsupportedModel as e:
+        print(f"Compact model not exported: {e}")
 
 
 
 
 if __name__ == '__main__':
-parser = argparse.ArgumentParser()
-parser.add_argument('--data', required=True)
-args = parser.parse_args()
-main(args.data)
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command')
+    select = commands.add_parser('select', help="evaluate a grid of models and write a benchmark report")
+    select.add_argument('--data', required=True)
+    select.add_argument('--grid', help='JSON file: {"vectorizer": {param: [values]}, "booster": {param: [values]}}')
+    select.add_argument('--workers', type=int, default=None)
+    select.add_argument('--latency-budget-ms', type=float, default=None, help="per 1k complaints")
+    select.add_argument('--report', default=str(Path(settings.model_path).parent / 'selection_report.json'))
+
+    parser.add_argument('--data')
+    parser.add_argument('--stream', action='store_true', help="train out of core, reading the CSV in chunks")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--rounds', type=int, default=BOOST_ROUNDS)
+    parser.add_argument('--warm-start', action='store_true', help="continue from the deployed model (implies --stream)")
+    args = parser.parse_args()
+    if args.command == 'select':
+        main_select(args.data, args.grid, args.workers, args.latency_budget_ms, args.report)
+    elif not args.data:
+        parser.error("--data is required")
+    elif args.stream or args.warm_start:
+        main_streaming(args.data, args.chunksize, args.rounds, args.warm_start)
+    else:
+        main(args.data)
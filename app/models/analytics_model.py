@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import date
+
+class ComplaintStatsGroup(BaseModel):
+    # Only the dimensions listed in group_by are set; None also stands for "not recorded"
+    day: Optional[date] = None
+    department: Optional[str] = None
+    category: Optional[str] = None
+    status: Optional[str] = None
+    complaints: int
+    average_urgency: Optional[float] = None
+    average_cost: Optional[float] = None
+    total_cost: float = 0.0
+
+class ComplaintStats(BaseModel):
+    group_by: List[str]
+    complaints: int
+    groups: List[ComplaintStatsGroup]
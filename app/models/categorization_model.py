@@ -1,27 +1,110 @@
-import random
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ..ml import predict
+from ..utils import priority_score_from_probs
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ["sewage", "garbage", "water", "roads", "electricity", "pollution", "safety"]
+DEPARTMENTS = {
+    "sewage": "Sanitation Dept",
+    "garbage": "Sanitation Dept",
+    "water": "Water Board",
+    "roads": "PWD",
+    "electricity": "Electricity Dept",
+    "pollution": "Environment Dept",
+    "safety": "Police Dept"
+}
+
+# Used only when no trained model is deployed, so complaints are still routed sensibly
+FALLBACK_KEYWORDS = {
+    "sewage": ["sewage", "sewer", "drain", "manhole", "gutter", "overflow"],
+    "garbage": ["garbage", "trash", "waste", "dump", "litter", "rubbish"],
+    "water": ["water", "pipe", "leak", "tap", "supply", "pipeline"],
+    "roads": ["road", "pothole", "street", "footpath", "bridge", "traffic signal"],
+    "electricity": ["electricity", "power", "streetlight", "street light", "wire", "transformer", "outage"],
+    "pollution": ["pollution", "smoke", "noise", "dust", "burning", "stench"],
+    "safety": ["safety", "accident", "crime", "theft", "harassment", "unsafe"]
+}
+_FALLBACK_PATTERNS = {
+    category: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + r")(?:s|es)?\b", re.IGNORECASE)
+    for category, words in FALLBACK_KEYWORDS.items()
+}
+URGENCY_PATTERN = re.compile(
+    r"\b(?:urgent|emergency|immediately|danger(?:ous)?|accident|fire|flood(?:ing)?|live wire|collapse|injur(?:y|ed))\b",
+    re.IGNORECASE
+)
+# Below this top-class probability the model isn't sure, which the scoring treats like an urgency cue
+LOW_CONFIDENCE = 0.4
+DEFAULT_SEVERITY = 5
+
 
 class ComplaintCategorizer:
     def __init__(self):
-        # In a real application, load your TF-IDF vectorizer and XGBoost model here
-        # For now, we'll use dummy logic
-        pass
+        self.ready = False
+        self.model_loaded = False
+        self.load_error: Optional[str] = None
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        # Called once from FastAPI startup so the first complaint doesn't pay the model load
+        with self._load_lock:
+            if self.ready:
+                return
+            try:
+                predict.load()
+                self.model_loaded = True
+            except Exception as e:
+                self.load_error = str(e)
+                logger.warning("Complaint model unavailable, using keyword fallback: %s", e)
+            self.ready = True
+
+    @property
+    def model_version(self) -> str:
+        return predict.model_version if self.model_loaded else "keyword-fallback"
+
+    def _classify(self, description: str) -> Tuple[str, Dict[str, float]]:
+        if self.model_loaded:
+            result = predict.predict(description)
+            return result["category"], result["probs"]
+
+        hits = {category: len(pattern.findall(description)) for category, pattern in _FALLBACK_PATTERNS.items()}
+        total = sum(hits.values())
+        if total == 0:
+            # Nothing recognisable: route to the general office at a neutral priority
+            return "general", {"general": LOW_CONFIDENCE}
+        probs = {category: count / total for category, count in hits.items()}
+        return max(probs, key=probs.get), probs
 
     def categorize_and_prioritize(self, description: str) -> dict:
-        # Dummy categorization and prioritization logic
-        categories = ["sewage", "garbage", "water", "roads", "electricity", "pollution", "safety"]
-        departments = {
-            "sewage": "Sanitation Dept",
-            "garbage": "Sanitation Dept",
-            "water": "Water Board",
-            "roads": "PWD",
-            "electricity": "Electricity Dept",
-            "pollution": "Environment Dept",
-            "safety": "Police Dept"
-        }
-        
-        predicted_category = random.choice(categories)
-        urgency_score = random.randint(0, 100)
-        assigned_department = departments.get(predicted_category, "General Dept")
+        if not self.ready:
+            self.load()
+
+        predicted_category, probs = self._classify(description)
+        return self._prioritize(description, predicted_category, probs)
+
+    def categorize_batch(self, descriptions: List[str]) -> List[dict]:
+        # One vectorize + predict call for the whole list; used by bulk jobs, bypasses the cache
+        if not self.ready:
+            self.load()
+
+        if self.model_loaded:
+            classified = [(result["category"], result["probs"]) for result in predict.predict_batch(descriptions)]
+        else:
+            classified = [self._classify(description) for description in descriptions]
+        return [
+            self._prioritize(description, category, probs)
+            for description, (category, probs) in zip(descriptions, classified)
+        ]
+
+    @staticmethod
+    def _prioritize(description: str, predicted_category: str, probs: Dict[str, float]) -> dict:
+        urgency_flag = bool(URGENCY_PATTERN.search(description)) or max(probs.values()) < LOW_CONFIDENCE
+        urgency_score = priority_score_from_probs(probs, urgency_flag, DEFAULT_SEVERITY)
+        assigned_department = DEPARTMENTS.get(predicted_category, "General Dept")
 
         return {
             "category": predicted_category,
@@ -30,5 +113,5 @@ class ComplaintCategorizer:
         }
 
 
-
-
+# Process-wide instance shared by every request; loaded during application startup
+categorizer = ComplaintCategorizer()
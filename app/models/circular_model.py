@@ -15,6 +15,15 @@ class CircularCreate(BaseModel):
     extracted_rules: List[ExtractedRule] = []
     eligibility_criteria: Optional[str] = None
     deadlines: Optional[str] = None
+    contact_info: Optional[str] = None
+    page_count: Optional[int] = None
+
+    def to_sql_dict(self):
+        data = self.dict(exclude_unset=True)
+        if "extracted_rules" in data and isinstance(data["extracted_rules"], list):
+            # .dict() has already turned each ExtractedRule into a plain dict
+            data["extracted_rules"] = json.dumps(data["extracted_rules"])
+        return data
 
 class Circular(CircularCreate):
     id: Optional[int] = None
@@ -34,9 +43,51 @@ class Circular(CircularCreate):
             except json.JSONDecodeError:
                 return []
         return v
-    
-    def to_sql_dict(self):
-        data = self.dict(exclude_unset=True)
-        if "extracted_rules" in data and isinstance(data["extracted_rules"], list):
-            data["extracted_rules"] = json.dumps([rule.dict() for rule in data["extracted_rules"]])
-        return data
+
+class CircularJobStage(BaseModel):
+    name: str # "extract", "nlp" or "persist"
+    status: str = "pending" # pending | running | completed | failed
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class CircularJob(BaseModel):
+    id: str
+    filename: str
+    status: str = "queued" # queued | running | completed | failed
+    stages: List[CircularJobStage] = []
+    pages_done: int = 0
+    page_count: Optional[int] = None
+    circular_id: Optional[int] = None
+    circular: Optional[Circular] = None
+    duplicate: bool = False # True when the same PDF had already been ingested
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+class CircularSearchHit(BaseModel):
+    id: int
+    filename: str
+    content_summary: Optional[str] = None
+    deadlines: Optional[str] = None
+    uploaded_at: Optional[datetime] = None
+    score: float
+    snippet: Optional[str] = None
+
+class CircularSearchResults(BaseModel):
+    query: str
+    total: int
+    page: int
+    page_size: int
+    results: List[CircularSearchHit] = []
+
+class CircularPage(BaseModel):
+    page: int
+    text: str
+
+class CircularPages(BaseModel):
+    circular_id: int
+    page_count: int
+    from_page: int
+    to_page: int
+    next_from: Optional[int] = None # Start of the following range, None on the last page
+    pages: List[CircularPage] = []
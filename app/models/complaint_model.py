@@ -20,6 +20,7 @@ class ComplaintCreate(BaseModel):
 class Complaint(ComplaintCreate):
     id: Optional[int] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    duplicate_of: Optional[int] = None # id of the open complaint this one repeats, when detected
 
     class Config:
         arbitrary_types_allowed = True
@@ -29,20 +30,21 @@ class Complaint(ComplaintCreate):
         # No populate_by_name needed for SQL
 
     @validator('required_resources', 'suggested_actions', 'tools_required', 'safety_notes', pre=True, always=True)
-    def parse_list_from_str(cls, v):
-        if v is None: # Explicitly handle None values
-            return []
-        if isinstance(v, str):
-            return [item.strip() for item in v.split(',') if item.strip()]
-        return v
-
-    # For converting lists back to comma-separated strings when saving to DB
+    def default_empty_list(cls, v):
+        # Stored as JSON lists; NULL (rows written before a field existed) reads as empty
+        return [] if v is None else v
+
     def to_sql_dict(self):
-        data = self.dict(exclude_unset=True)
-        for field in ['required_resources', 'suggested_actions', 'tools_required', 'safety_notes']:
-            if field in data and isinstance(data[field], list):
-                data[field] = ",".join(data[field])
-        return data
+        return self.dict(exclude_unset=True)
 
 class ComplaintStatusUpdate(BaseModel):
     status: str
+
+class ComplaintReprioritize(BaseModel):
+    # Either or both; omitted fields keep their current value
+    urgency_score: Optional[int] = Field(None, ge=0, le=100)
+    sla_hours: Optional[int] = Field(None, ge=1)
+
+class ComplaintQueuePage(BaseModel):
+    items: List[Complaint]
+    next_cursor: Optional[str] = None # pass back as ?cursor= for the next page; None on the last page
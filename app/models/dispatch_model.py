@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class DispatchTask(BaseModel):
+    complaint_id: int
+    urgency_score: int
+    sla_deadline: Optional[datetime] = None # UTC; None when the complaint has no SLA
+    overdue: bool = False
+
+class DispatchTasks(BaseModel):
+    department: str
+    queued: int # open complaints waiting in this department's queue
+    tasks: List[DispatchTask]
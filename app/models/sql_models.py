@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Boolean, LargeBinary, ForeignKey, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
 # from sqlalchemy.dialects.postgresql import ARRAY # Removed PostgreSQL specific import
 from datetime import datetime
@@ -16,13 +16,40 @@ class ComplaintSQL(Base):
     urgency_score = Column(Integer, nullable=True)
     department = Column(String, nullable=True)
     estimated_cost = Column(Float, nullable=True)
-    required_resources = Column(Text, nullable=True) # Stored as comma-separated string
-    suggested_actions = Column(Text, nullable=True) # Stored as comma-separated string
-    tools_required = Column(Text, nullable=True) # Stored as comma-separated string
-    safety_notes = Column(Text, nullable=True) # Stored as comma-separated string
+    required_resources = Column(JSON, nullable=True) # List of strings
+    suggested_actions = Column(JSON, nullable=True) # List of strings
+    tools_required = Column(JSON, nullable=True) # List of strings
+    safety_notes = Column(JSON, nullable=True) # List of strings
     sla_hours = Column(Integer, nullable=True)
     status = Column(String, default="pending")
     created_at = Column(DateTime, default=datetime.utcnow)
+    minhash = Column(LargeBinary, nullable=True) # MinHash signature of the description, see app/ml/minhash.py
+    duplicate_of = Column(Integer, ForeignKey("complaints.id"), nullable=True, index=True) # original this complaint repeats
+
+    # Priority queue: one index per filter combination so "highest urgency first" is always an
+    # index walk, never a sort. id breaks ties and makes the keyset cursor unique.
+    __table_args__ = (
+        Index("ix_complaints_queue_department_status", "department", "status", "urgency_score", "id"),
+        Index("ix_complaints_queue_department", "department", "urgency_score", "id"),
+        Index("ix_complaints_queue_status", "status", "urgency_score", "id"),
+        Index("ix_complaints_queue", "urgency_score", "id"),
+    )
+
+class ComplaintRollupSQL(Base):
+    __tablename__ = "complaint_rollups"
+
+    # Complaint totals per (day, department, category, status), kept current by every write to
+    # complaints, so analytics read these groups instead of the complaints table. Missing
+    # dimension values are stored as "" so every key column can be part of the primary key.
+    day = Column(Date, primary_key=True)
+    department = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    complaint_count = Column(Integer, nullable=False, default=0)
+    urgency_sum = Column(Integer, nullable=False, default=0)
+    urgency_count = Column(Integer, nullable=False, default=0) # complaints with an urgency score
+    cost_sum = Column(Float, nullable=False, default=0.0)
+    cost_count = Column(Integer, nullable=False, default=0) # complaints with an estimated cost
 
 class CircularSQL(Base):
     __tablename__ = "circulars"
@@ -34,8 +61,35 @@ class CircularSQL(Base):
     extracted_rules = Column(Text, nullable=True) # Stored as JSON string
     eligibility_criteria = Column(Text, nullable=True)
     deadlines = Column(String, nullable=True)
+    contact_info = Column(Text, nullable=True)
+    content_sha256 = Column(String(64), unique=True, index=True, nullable=True) # Hash of the uploaded PDF bytes
+    page_count = Column(Integer, nullable=True)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
+class CircularPageSQL(Base):
+    __tablename__ = "circular_pages"
+
+    # One row per page so a page range is a primary-key range scan, never a whole-document load
+    circular_id = Column(Integer, ForeignKey("circulars.id", ondelete="CASCADE"), primary_key=True)
+    page_number = Column(Integer, primary_key=True) # 1-based
+    text = Column(LargeBinary) # zlib-compressed UTF-8
+
+class PageExtractionSQL(Base):
+    __tablename__ = "page_extractions"
+
+    # Extraction result cache keyed by page fingerprint, shared by every circular containing that page
+    fingerprint = Column(String(64), primary_key=True)
+    text = Column(Text)
+    method = Column(String) # "text" or "ocr"
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SchemaMigrationSQL(Base):
+    __tablename__ = "schema_migrations"
+
+    # One row per data migration in migrations.DATA_MIGRATIONS that has been applied to this database
+    name = Column(String, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
 class UserSQL(Base):
     __tablename__ = "users"
 
@@ -1,16 +1,172 @@
 # simple heuristics to extract eligibility, deadlines, contact info from circular text
 import re
+from datetime import date
+from typing import Dict, Iterable, List, Optional
 
 
-def extract_deadlines(text: str) -> list:
-# naive: find date-like patterns
-patterns = re.findall(r"\b\d{1,2}[\-/ ](?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec|\d{2,4})[\-/ ]?\d{2,4}\b", text, flags=re.I)
-return patterns
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+
+# One alternation so a single finditer pass over the text finds every kind of fact. Everything except
+# emails (anchored on "@" and expanded backwards) sits behind a word boundary plus a first-character
+# lookahead, so the regex engine rejects most positions without trying each alternative.
+_FACTS = re.compile(
+    r"(?P<email>@[\w-]+(?:\.[\w-]+)+)"
+    r"|(?P<intl_phone>\+91[ -]?[6-9]\d{4}[ -]?\d{5}\b)"
+    r"|\b(?=[\dadefjmnos])(?:"
+    r"(?P<iso_y>\d{4})-(?P<iso_m>\d{1,2})-(?P<iso_d>\d{1,2})\b"
+    # Same separator twice, and not a version string ("version 1.2.2024", "build 2.1.2.2024")
+    r"|(?<!\d\.)(?<!version )(?<!release )(?<!build )(?<!ver\. )(?<!ver )(?P<num_d>\d{1,2})(?P<num_sep>[-/.])(?P<num_m>\d{1,2})(?P=num_sep)(?P<num_y>\d{4}|\d{2})\b(?![-/.]\d)"
+    r"|(?P<dmy_d>\d{1,2})(?:st|nd|rd|th)?[ -](?:of )?(?P<dmy_m>" + _MONTH + r")[ ,-]*(?P<dmy_y>\d{4})\b"
+    r"|(?P<phone>0?[6-9]\d{4}[ -]?\d{5}\b|0\d{2,4}[ -]\d{6,8}\b)"
+    r"|(?P<mdy_m>" + _MONTH + r") (?P<mdy_d>\d{1,2})(?:st|nd|rd|th)?,? (?P<mdy_y>\d{4})\b"
+    r"|(?P<eligibility>eligib(?:le|ility)\b)"
+    r")",
+    re.IGNORECASE,
+)
+# A date only counts as a deadline when one of these cues appears shortly before it in the same sentence.
+# A bare "by" or "before" is too common ("issued by the Commissioner on ...") and only counts after a
+# submission verb.
+_DEADLINE_CUE = re.compile(
+    r"\b(?:deadline|last date|due date|due on|closing date|on or before|not later than|no later than|latest by"
+    r"|(?:submit(?:ted)?|submission|apply|applied|applications?|reach|received|register(?:ed)?|filed?)\b[^.\n]{0,60}?\b(?:by|before))\b",
+    re.IGNORECASE,
+)
+_SENTENCE_END = re.compile(r"\.(?:\s|$)|\n\s*\n")
+_WHITESPACE = re.compile(r"\s+")
+
+DEADLINE_CUE_WINDOW = 80
+MAX_CLAUSE_CHARS = 400
+# Text kept from the previous chunk: enough to look back for a clause start or a deadline cue
+CONTEXT_CHARS = MAX_CLAUSE_CHARS
+# Matches starting this close to the end of a chunk wait for the next one, so nothing is cut in half
+TAIL_CHARS = MAX_CLAUSE_CHARS
+
+
+def _to_iso(year: str, month: str, day: str) -> Optional[str]:
+    month_num = int(month) if month.isdigit() else MONTHS.get(month[:3].lower())
+    year_num = int(year)
+    if year_num < 100:
+        year_num += 2000
+    try:
+        return date(year_num, month_num, int(day)).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+class CircularFactExtractor:
+    """Single-pass extractor for deadlines, eligibility clauses and contact details.
+
+    Text is fed in chunks (e.g. one page at a time) and only a small tail of the previous
+    chunk is retained, so memory stays constant regardless of document length.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self.dates: List[str] = []
+        self.deadlines: List[str] = []
+        self.eligibility: List[str] = []
+        self.emails: List[str] = []
+        self.phones: List[str] = []
+
+    def feed(self, chunk: str):
+        self._buffer += chunk
+        self._scan(final=False)
+
+    def close(self) -> Dict[str, List[str]]:
+        self._scan(final=True)
+        self._buffer = ""
+        self._pos = 0
+        return self.result()
 
+    def result(self) -> Dict[str, List[str]]:
+        return {
+            "dates": self.dates,
+            "deadlines": self.deadlines,
+            "eligibility": self.eligibility,
+            "emails": self.emails,
+            "phones": self.phones,
+        }
 
+    def _scan(self, final: bool):
+        buffer = self._buffer
+        limit = len(buffer) if final else len(buffer) - TAIL_CHARS
+        resume = self._pos
+        for match in _FACTS.finditer(buffer, self._pos):
+            if match.start() >= limit:
+                break
+            self._handle(buffer, match)
+            resume = match.end()
+
+        if not final:
+            resume = max(resume, limit, self._pos)
+            keep_from = max(0, resume - CONTEXT_CHARS)
+            self._buffer = buffer[keep_from:]
+            self._pos = resume - keep_from
+
+    def _handle(self, buffer: str, match: re.Match):
+        kind = match.lastgroup
+        if kind == "eligibility":
+            clause = self._clause_around(buffer, match.start())
+            if clause and clause not in self.eligibility:
+                self.eligibility.append(clause)
+        elif kind == "email":
+            start = match.start()
+            while start > 0 and (buffer[start - 1].isalnum() or buffer[start - 1] in "._+-"):
+                start -= 1
+            if start < match.start():
+                self._add_unique(self.emails, buffer[start:match.end()].lower())
+        elif kind in ("phone", "intl_phone"):
+            self._add_unique(self.phones, re.sub(r"[ -]", "", match.group()))
+        else:
+            prefix = kind.split("_")[0]
+            iso = _to_iso(match.group(prefix + "_y"), match.group(prefix + "_m"), match.group(prefix + "_d"))
+            if iso is None:
+                return
+            self._add_unique(self.dates, iso)
+            if _DEADLINE_CUE.search(buffer, self._sentence_start(buffer, match.start()), match.start()):
+                self._add_unique(self.deadlines, iso)
+
+    @staticmethod
+    def _add_unique(values: List[str], value: str):
+        if value not in values:
+            values.append(value)
+
+    @staticmethod
+    def _sentence_start(buffer: str, position: int) -> int:
+        start = max(0, position - DEADLINE_CUE_WINDOW)
+        for end_match in _SENTENCE_END.finditer(buffer, start, position):
+            start = end_match.end()
+        return start
+
+    @staticmethod
+    def _clause_around(buffer: str, position: int) -> str:
+        window_start = max(0, position - MAX_CLAUSE_CHARS // 2)
+        start = window_start
+        for end_match in _SENTENCE_END.finditer(buffer, window_start, position):
+            start = end_match.end()
+        end_match = _SENTENCE_END.search(buffer, position, position + MAX_CLAUSE_CHARS // 2)
+        end = end_match.start() + 1 if end_match else min(len(buffer), position + MAX_CLAUSE_CHARS // 2)
+        return _WHITESPACE.sub(" ", buffer[start:end]).strip()
+
+
+def extract_facts(chunks: Iterable[str]) -> Dict[str, List[str]]:
+    extractor = CircularFactExtractor()
+    for chunk in chunks:
+        extractor.feed(chunk)
+    return extractor.close()
+
+
+def extract_deadlines(text: str) -> list:
+    # ISO dates (YYYY-MM-DD) that appear next to a deadline cue such as "last date" or "on or before"
+    return extract_facts([text])["deadlines"]
 
 
 def extract_eligibility(text: str) -> str:
-# look for 'eligible' lines
-m = re.search(r"(eligible[^.\n]+[.\n])", text, flags=re.I)
-return m.group(1) if m else ""
\ No newline at end of file
+    # first clause mentioning eligibility
+    clauses = extract_facts([text])["eligibility"]
+    return clauses[0] if clauses else ""
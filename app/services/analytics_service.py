@@ -0,0 +1,170 @@
+"""
+Complaint analytics served from the complaint_rollups table.
+
+    python -m app.services.analytics_service --rebuild
+
+Every write to complaints (create, bulk create, status update, re-classification) adds its net
+change to the affected rollup groups in the same transaction, so an analytics query reads
+O(groups) rows however many complaints there are. --rebuild regenerates the table from the
+complaints themselves, e.g. after editing complaints by hand.
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..migrations import data_migration
+from ..models.analytics_model import ComplaintStats, ComplaintStatsGroup
+from ..models.sql_models import ComplaintRollupSQL, ComplaintSQL
+
+DIMENSIONS = ("day", "department", "category", "status")
+MEASURES = ("complaint_count", "urgency_sum", "urgency_count", "cost_sum", "cost_count")
+# Complaint columns the rollup groups and measures are computed from
+ROLLUP_SOURCE_COLUMNS = ("created_at", "department", "category", "status", "urgency_score", "estimated_cost")
+
+
+class RollupDeltas:
+    # Net change per rollup group for a set of complaint writes: add(old, -1) and add(new, +1)
+    # for an update, add(new) for an insert. Groups that cancel out are not written.
+    def __init__(self):
+        self.groups: Dict[tuple, list] = defaultdict(lambda: [0, 0, 0, 0.0, 0])
+
+    def add(self, complaint, sign: int = 1):
+        # complaint is anything with the complaint's column attributes: a Row, ComplaintSQL or Complaint
+        created_at = complaint.created_at or datetime.utcnow()
+        measures = self.groups[(created_at.date(), complaint.department or "", complaint.category or "", complaint.status or "")]
+        measures[0] += sign
+        if complaint.urgency_score is not None:
+            measures[1] += sign * complaint.urgency_score
+            measures[2] += sign
+        if complaint.estimated_cost is not None:
+            measures[3] += sign * complaint.estimated_cost
+            measures[4] += sign
+
+    def params(self) -> List[dict]:
+        return [
+            {**dict(zip(DIMENSIONS, key)), **dict(zip(MEASURES, measures))}
+            for key, measures in self.groups.items() if any(measures)
+        ]
+
+
+def rollup_guard(complaint) -> list:
+    # WHERE clauses for an UPDATE whose delta was computed from `complaint` as read: it only applies
+    # if none of the rollup source columns changed since, otherwise the delta lands in the wrong group
+    columns = ComplaintSQL.__table__.c
+    return [columns[name].is_not_distinct_from(getattr(complaint, name)) for name in ROLLUP_SOURCE_COLUMNS]
+
+
+def rollup_upsert(dialect_name: str):
+    # INSERT ... ON CONFLICT DO UPDATE adding the delta to the stored group; run executemany
+    # with RollupDeltas.params(). SQLite and PostgreSQL share the syntax.
+    table = ComplaintRollupSQL.__table__
+    statement = (postgresql.insert if dialect_name == "postgresql" else sqlite.insert)(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c[name] for name in DIMENSIONS],
+        set_={name: table.c[name] + statement.excluded[name] for name in MEASURES}
+    )
+
+
+@data_migration("0002_complaint_rollups")
+def rebuild_complaint_rollups(conn):
+    # One INSERT ... SELECT ... GROUP BY over complaints; also the data migration that first fills the table
+    complaints = ComplaintSQL.__table__.c
+    rollups = ComplaintRollupSQL.__table__
+    dimensions = [
+        func.date(complaints.created_at),
+        func.coalesce(complaints.department, ""),
+        func.coalesce(complaints.category, ""),
+        func.coalesce(complaints.status, ""),
+    ]
+    conn.execute(rollups.delete())
+    conn.execute(rollups.insert().from_select(
+        list(DIMENSIONS) + list(MEASURES),
+        select(
+            *dimensions,
+            func.count(),
+            func.coalesce(func.sum(complaints.urgency_score), 0),
+            func.count(complaints.urgency_score),
+            func.coalesce(func.sum(complaints.estimated_cost), 0.0),
+            func.count(complaints.estimated_cost),
+        ).group_by(*dimensions)
+    ))
+
+
+class AnalyticsService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def complaint_stats_statement(group_by: Sequence[str], day_from: Optional[date] = None, day_to: Optional[date] = None,
+                                  department: Optional[str] = None, category: Optional[str] = None,
+                                  status: Optional[str] = None):
+        # day_from is inclusive and day_to exclusive, like the export date range
+        columns = [getattr(ComplaintRollupSQL, dimension) for dimension in group_by]
+        statement = select(*columns, *[func.sum(getattr(ComplaintRollupSQL, measure)).label(measure) for measure in MEASURES])
+        if day_from:
+            statement = statement.where(ComplaintRollupSQL.day >= day_from)
+        if day_to:
+            statement = statement.where(ComplaintRollupSQL.day < day_to)
+        if department:
+            statement = statement.where(ComplaintRollupSQL.department == department)
+        if category:
+            statement = statement.where(ComplaintRollupSQL.category == category)
+        if status:
+            statement = statement.where(ComplaintRollupSQL.status == status)
+        return statement.group_by(*columns).order_by(*columns)
+
+    @staticmethod
+    def _complaint_stats(group_by: Sequence[str], rows) -> ComplaintStats:
+        groups = []
+        for row in rows:
+            values = row._mapping
+            if not values["complaint_count"]:
+                continue
+            groups.append(ComplaintStatsGroup(
+                **{dimension: values[dimension] or None for dimension in group_by},
+                complaints=values["complaint_count"],
+                average_urgency=round(values["urgency_sum"] / values["urgency_count"], 2) if values["urgency_count"] else None,
+                average_cost=round(values["cost_sum"] / values["cost_count"], 2) if values["cost_count"] else None,
+                total_cost=round(values["cost_sum"], 2)
+            ))
+        return ComplaintStats(group_by=list(group_by), complaints=sum(group.complaints for group in groups), groups=groups)
+
+    def complaint_stats(self, group_by: Sequence[str], **filters) -> ComplaintStats:
+        return self._complaint_stats(group_by, self.db.execute(self.complaint_stats_statement(group_by, **filters)).all())
+
+    def rebuild(self):
+        rebuild_complaint_rollups(self.db.connection())
+        self.db.commit()
+
+
+class AsyncAnalyticsService:
+    # AnalyticsService for async endpoints, run on this AsyncSession's connection through run_sync
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def complaint_stats(self, group_by: Sequence[str], **filters) -> ComplaintStats:
+        return await self.db.run_sync(lambda session: AnalyticsService(session).complaint_stats(group_by, **filters))
+
+
+if __name__ == '__main__':
+    from ..db import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rebuild', action='store_true', help="regenerate complaint_rollups from the complaints table")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            AnalyticsService(db).rebuild()
+        for group in AnalyticsService(db).complaint_stats(["department"]).groups:
+            print(f"{group.department or '-':<24} {group.complaints:>9} {group.average_urgency or 0:>8.2f} {group.total_cost:>14.2f}")
+    finally:
+        db.close()
@@ -1,5 +1,8 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
 from ..models.sql_models import UserSQL
 from ..models.user_model import UserCreate, UserInDB
@@ -29,4 +32,28 @@ class AuthService:
     def get_user_by_id(self, user_id: int) -> UserSQL | None:
         return self.db.query(UserSQL).filter(UserSQL.id == user_id).first()
 
+class AsyncAuthService:
+    # Same operations for async endpoints. bcrypt is deliberately slow, so hashing and
+    # verification run in the threadpool rather than on the event loop.
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user(self, email: str) -> UserSQL | None:
+        return (await self.db.execute(select(UserSQL).where(UserSQL.email == email))).scalars().first()
+
+    async def create_user(self, user: UserCreate) -> UserInDB:
+        hashed_password = await run_in_threadpool(get_password_hash, user.password)
+        db_user = UserSQL(email=user.email, hashed_password=hashed_password, role=user.role)
+        self.db.add(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        return UserInDB.from_orm(db_user)
+
+    async def authenticate_user(self, email: str, password: str) -> UserSQL | None:
+        user = await self.get_user(email)
+        if not user or not await run_in_threadpool(verify_password, password, user.hashed_password):
+            return None
+        return user
 
+    async def get_user_by_id(self, user_id: int) -> UserSQL | None:
+        return await self.db.get(UserSQL, user_id)
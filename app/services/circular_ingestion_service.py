@@ -0,0 +1,148 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from ..db import SessionLocal
+from ..models.circular_model import Circular, CircularJob, CircularJobStage
+from ..services.pdf_processing_service import PdfProcessingService
+
+# Circulars processed concurrently. Extraction itself fans pages out across the PDF process pool,
+# so a couple of ingestion threads are enough to keep every core busy.
+INGESTION_WORKERS = 2
+# Jobs allowed to wait or run at once; further uploads are rejected instead of queueing unboundedly
+MAX_PENDING_JOBS = 32
+# Finished jobs are kept around this long so clients can poll for the result
+JOB_RETENTION = timedelta(hours=1)
+
+STAGES = ["extract", "nlp", "persist"]
+
+# Job records live in this process only: run the API with a single worker process (uvicorn's
+# default), otherwise a poll may reach a worker that never saw the job and get a 404
+_jobs: Dict[str, CircularJob] = {}
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class IngestionQueueFull(Exception):
+    pass
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=INGESTION_WORKERS, thread_name_prefix="circular-ingest")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class CircularIngestionService:
+    def submit(self, filename: str, pdf_content: bytes) -> CircularJob:
+        content_sha256 = PdfProcessingService.content_hash(pdf_content)
+        with _lock:
+            self._prune_finished_jobs()
+            pending = sum(1 for job in _jobs.values() if job.status in ("queued", "running"))
+            if pending >= MAX_PENDING_JOBS:
+                raise IngestionQueueFull(f"{pending} circulars are already being processed")
+
+            job = CircularJob(
+                id=uuid.uuid4().hex,
+                filename=PdfProcessingService.safe_filename(filename),
+                stages=[CircularJobStage(name=name) for name in STAGES]
+            )
+            _jobs[job.id] = job
+
+        _get_executor().submit(self._run, job.id, filename, pdf_content, content_sha256)
+        return job.copy(deep=True)
+
+    def completed_duplicate(self, filename: str, circular: Circular) -> CircularJob:
+        # Re-uploads of an already ingested PDF skip the worker pool entirely
+        now = datetime.utcnow()
+        return CircularJob(
+            id=uuid.uuid4().hex,
+            filename=PdfProcessingService.safe_filename(filename),
+            status="completed",
+            stages=[CircularJobStage(name=name, status="completed", started_at=now, finished_at=now) for name in STAGES],
+            circular_id=circular.id,
+            circular=circular,
+            duplicate=True,
+            finished_at=now
+        )
+
+    def get_job(self, job_id: str) -> Optional[CircularJob]:
+        with _lock:
+            job = _jobs.get(job_id)
+            # Hand out a snapshot so the worker thread can keep updating the live record
+            return job.copy(deep=True) if job else None
+
+    def _prune_finished_jobs(self):
+        cutoff = datetime.utcnow() - JOB_RETENTION
+        expired = [job_id for job_id, job in _jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del _jobs[job_id]
+
+    def _update(self, job_id: str, **fields):
+        with _lock:
+            job = _jobs[job_id]
+            for name, value in fields.items():
+                setattr(job, name, value)
+
+    @contextmanager
+    def _stage(self, job_id: str, name: str):
+        with _lock:
+            stage = next(s for s in _jobs[job_id].stages if s.name == name)
+            stage.status = "running"
+            stage.started_at = datetime.utcnow()
+        try:
+            yield
+        except Exception:
+            with _lock:
+                stage.status = "failed"
+                stage.finished_at = datetime.utcnow()
+            raise
+        with _lock:
+            stage.status = "completed"
+            stage.finished_at = datetime.utcnow()
+
+    def _run(self, job_id: str, filename: str, pdf_content: bytes, content_sha256: str):
+        self._update(job_id, status="running")
+        # Jobs outlive the request that created them, so each one gets its own session
+        db = SessionLocal()
+        try:
+            pdf_processing_service = PdfProcessingService(db)
+
+            # An identical upload may have been queued behind this one's twin
+            existing = pdf_processing_service.get_circular_by_hash(content_sha256)
+            if existing:
+                now = datetime.utcnow()
+                with _lock:
+                    for stage in _jobs[job_id].stages:
+                        stage.status = "completed"
+                        stage.started_at = stage.finished_at = now
+                self._update(job_id, status="completed", circular_id=existing.id, circular=existing,
+                             duplicate=True, finished_at=now)
+                return
+
+            def on_progress(done: int, total: int):
+                self._update(job_id, pages_done=done, page_count=total)
+
+            with self._stage(job_id, "extract"):
+                pages = pdf_processing_service.extract_pages_from_pdf(pdf_content, on_progress=on_progress)
+            with self._stage(job_id, "nlp"):
+                nlp_results = pdf_processing_service.process_circular_nlp(pages)
+            with self._stage(job_id, "persist"):
+                circular = pdf_processing_service.persist_circular(filename, nlp_results, content_sha256, pages)
+
+            self._update(job_id, status="completed", circular_id=circular.id, circular=circular, finished_at=datetime.utcnow())
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+        finally:
+            db.close()
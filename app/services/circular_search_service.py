@@ -0,0 +1,162 @@
+import json
+import re
+import zlib
+from typing import Iterable, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models.circular_model import CircularSearchHit, CircularSearchResults
+from ..models.sql_models import CircularSQL, CircularPageSQL
+
+FTS_TABLE = "circulars_fts"
+# bm25 column weights: filename, content_summary, extracted_rules, body
+BM25_WEIGHTS = (2.0, 4.0, 3.0, 1.0)
+# PostgreSQL only has four weight classes (A highest); same ordering as BM25_WEIGHTS
+TSVECTOR_WEIGHTS = {"filename": "C", "content_summary": "A", "extracted_rules": "B", "body": "D"}
+SNIPPET_TOKENS = 16
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class CircularSearchService:
+    def __init__(self, db: Session):
+        self.db = db
+        # SQLite uses FTS5; PostgreSQL gets the same API from a weighted tsvector + GIN index
+        self.postgres = db.get_bind().dialect.name == "postgresql"
+
+    @staticmethod
+    def create_index(engine: Engine):
+        # rowid of the FTS row is the circular id. The index keeps its own copy of the text so
+        # snippet() can highlight matches without touching the circulars table.
+        if inspect(engine).has_table(FTS_TABLE):
+            return
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+                    "rowid INTEGER PRIMARY KEY REFERENCES circulars (id) ON DELETE CASCADE, "
+                    "filename TEXT, content_summary TEXT, extracted_rules TEXT, body TEXT, document TSVECTOR)"
+                ))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{FTS_TABLE}_document ON {FTS_TABLE} USING GIN (document)"))
+            else:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    "filename, content_summary, extracted_rules, body, tokenize='unicode61 remove_diacritics 2')"
+                ))
+        with Session(bind=engine) as db:
+            CircularSearchService(db).rebuild_index()
+
+    def rebuild_index(self):
+        self.db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        for circular in self.db.query(CircularSQL).yield_per(500):
+            pages = (
+                zlib.decompress(row.text).decode("utf-8")
+                for row in self.db.query(CircularPageSQL.text)
+                .filter(CircularPageSQL.circular_id == circular.id)
+                .order_by(CircularPageSQL.page_number)
+            )
+            self.index_circular(circular, list(pages))
+        self.db.commit()
+
+    def index_circular(self, circular: CircularSQL, pages: Optional[Iterable[str]] = None):
+        # Called inside the ingestion transaction, so the index never lags behind the circulars table
+        self.db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": circular.id})
+        document = ""
+        if self.postgres:
+            # 'simple' config: no stemming or stop words, like FTS5's unicode61, so Indic text indexes too
+            document = ", " + " || ".join(
+                f"setweight(to_tsvector('simple', :{column}), '{weight}')" for column, weight in TSVECTOR_WEIGHTS.items()
+            )
+        self.db.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE} (rowid, filename, content_summary, extracted_rules, body"
+                f"{', document' if self.postgres else ''}) "
+                f"VALUES (:id, :filename, :content_summary, :extracted_rules, :body{document})"
+            ),
+            {
+                "id": circular.id,
+                "filename": circular.filename or "",
+                "content_summary": circular.content_summary or "",
+                "extracted_rules": self._rules_text(circular.extracted_rules),
+                "body": "\n".join(pages) if pages else "",
+            },
+        )
+
+    @staticmethod
+    def _rules_text(extracted_rules: Optional[str]) -> str:
+        # Index the rule sentences, not the JSON keys around them
+        try:
+            rules = json.loads(extracted_rules or "[]")
+        except json.JSONDecodeError:
+            return extracted_rules or ""
+        return "\n".join(rule.get("rule_text", "") for rule in rules if isinstance(rule, dict))
+
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        # Quote every term so user input can never be parsed as FTS5 syntax (AND/NEAR/column filters);
+        # the last term is a prefix match so partially typed words still find results
+        terms = [f'"{term}"' for term in _TOKEN.findall(query)]
+        if terms:
+            terms[-1] += "*"
+        return " ".join(terms)
+
+    @staticmethod
+    def _tsquery(query: str) -> str:
+        # Same semantics as _match_expression: every term required, last one as a prefix
+        terms = [term.lower() for term in _TOKEN.findall(query)]
+        if terms:
+            terms[-1] += ":*"
+        return " & ".join(terms)
+
+    def _search_postgres(self, query: str, page: int, page_size: int) -> CircularSearchResults:
+        tsquery = self._tsquery(query)
+        if not tsquery:
+            return CircularSearchResults(query=query, total=0, page=page, page_size=page_size, results=[])
+        total = self.db.execute(
+            text(f"SELECT count(*) FROM {FTS_TABLE} WHERE document @@ to_tsquery('simple', :tsquery)"),
+            {"tsquery": tsquery}
+        ).scalar()
+        rows = self.db.execute(
+            text(
+                f"SELECT c.id, c.filename, c.content_summary, c.deadlines, c.uploaded_at, "
+                f"ts_rank_cd(f.document, q) AS score, "
+                f"ts_headline('simple', coalesce(nullif(f.body, ''), f.content_summary, ''), q, "
+                f"'StartSel=<mark>, StopSel=</mark>, MaxWords={SNIPPET_TOKENS}, MinWords={SNIPPET_TOKENS // 2}') AS snippet "
+                f"FROM {FTS_TABLE} f JOIN circulars c ON c.id = f.rowid, to_tsquery('simple', :tsquery) q "
+                "WHERE f.document @@ q "
+                "ORDER BY score DESC, c.id DESC LIMIT :limit OFFSET :offset"
+            ),
+            {"tsquery": tsquery, "limit": page_size, "offset": (page - 1) * page_size},
+        ).mappings().all()
+        results = [CircularSearchHit(**row) for row in rows]
+        return CircularSearchResults(query=query, total=total, page=page, page_size=page_size, results=results)
+
+    def search(self, query: str, page: int = 1, page_size: int = 20) -> CircularSearchResults:
+        if self.postgres:
+            return self._search_postgres(query, page, page_size)
+        match = self._match_expression(query)
+        if not match:
+            return CircularSearchResults(query=query, total=0, page=page, page_size=page_size, results=[])
+
+        total = self.db.execute(
+            text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"), {"match": match}
+        ).scalar()
+        rows = self.db.execute(
+            text(
+                f"SELECT c.id, c.filename, c.content_summary, c.deadlines, c.uploaded_at, "
+                f"bm25({FTS_TABLE}, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score, "
+                f"snippet({FTS_TABLE}, -1, '<mark>', '</mark>', '…', {SNIPPET_TOKENS}) AS snippet "
+                f"FROM {FTS_TABLE} JOIN circulars c ON c.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH :match "
+                "ORDER BY score LIMIT :limit OFFSET :offset"
+            ),
+            {"match": match, "limit": page_size, "offset": (page - 1) * page_size},
+        ).mappings().all()
+
+        results: List[CircularSearchHit] = [
+            # bm25 is "lower is better"; flip the sign so clients can sort descending on score
+            CircularSearchHit(**{**row, "score": -row["score"]}) for row in rows
+        ]
+        return CircularSearchResults(query=query, total=total, page=page, page_size=page_size, results=results)
@@ -1,129 +1,318 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models.complaint_model import Complaint, ComplaintCreate
 from ..models.sql_models import ComplaintSQL
-from ..models.categorization_model import ComplaintCategorizer
+from ..models.categorization_model import categorizer
 from ..services.multilingual_service import MultilingualService
 from ..services.cost_estimation_service import CostEstimationService
 from ..services.field_officer_service import FieldOfficerService
-from typing import Optional, List
+from ..services.analytics_service import RollupDeltas, rollup_guard, rollup_upsert
+from ..services.duplicate_detection_service import duplicate_detector
+from ..services.dispatch_service import dispatch_queue
+from typing import Callable, Optional, List, Tuple
+import base64
 import json
 
+# Complaints classified and inserted together by the bulk endpoint; one transaction each
+BULK_BATCH_SIZE = 1000
+
+# Every column a Complaint response needs, in model field order. Reads select these directly
+# instead of loading ORM instances, which skips identity-map and attribute-state bookkeeping.
+COMPLAINT_COLUMNS = tuple(ComplaintSQL.__table__.c[name] for name in Complaint.model_fields if name in ComplaintSQL.__table__.c)
+COMPLAINT_FIELDS = tuple(column.name for column in COMPLAINT_COLUMNS)
+LIST_FIELDS = ("required_resources", "suggested_actions", "tools_required", "safety_notes")
+
+class InvalidCursor(ValueError):
+    pass
+
 class ComplaintService:
     def __init__(self, db: Session):
         self.db = db
-        self.categorizer = ComplaintCategorizer()
+        self.categorizer = categorizer # shared, loaded once at startup
         self.multilingual_service = MultilingualService()
         self.cost_estimation_service = CostEstimationService()
         self.field_officer_service = FieldOfficerService()
 
     def create_complaint(self, complaint_data: ComplaintCreate) -> Complaint:
+        self.enrich(complaint_data)
+        return self.insert_complaint(complaint_data)
+
+    def insert_complaint(self, complaint_data: ComplaintCreate) -> Complaint:
+        # Stores an already enriched complaint
+        duplicate_fields = self.duplicate_fields(complaint_data)
+
+        # INSERT ... RETURNING hands back the stored row directly, no refresh round trip
+        row = self.db.execute(
+            insert(ComplaintSQL).values(**complaint_data.dict(exclude_unset=True), **duplicate_fields)
+            .returning(*COMPLAINT_COLUMNS)
+        ).one()
+        deltas = RollupDeltas()
+        deltas.add(row)
+        self.apply_rollups(deltas)
+        self.db.commit()
+        duplicate_detector.track(row.id, row.category, row.status, row.duplicate_of, duplicate_fields["minhash"])
+        dispatch_queue.track(row)
+        return self.to_complaint(row)
+
+    def create_complaints(self, complaints: List[ComplaintCreate]) -> List[Complaint]:
+        return self.insert_complaints(complaints, self.enrich_batch(complaints))
+
+    def insert_complaints(self, complaints: List[ComplaintCreate], signatures: list) -> List[Complaint]:
+        # Bulk path: one executemany INSERT ... RETURNING for the whole (enriched) batch, committed
+        # together. Returns the stored complaints in input order.
+        rows = self.db.execute(
+            insert(ComplaintSQL).returning(*COMPLAINT_COLUMNS, sort_by_parameter_order=True),
+            [{**complaint_data.dict(), "minhash": signature.tobytes()}
+             for complaint_data, signature in zip(complaints, signatures)]
+        ).all()
+
+        # Duplicates are linked once ids exist, in input order, so repeats within the batch are caught too
+        links = {}
+        indexed = []
+        for row, signature in zip(rows, signatures):
+            duplicate_of = duplicate_detector.find(row.category, signature)
+            if duplicate_of is not None:
+                links[row.id] = duplicate_of
+            else:
+                duplicate_detector.track(row.id, row.category, row.status, None, signature.tobytes())
+                indexed.append(row.id)
+        try:
+            if links:
+                self.db.execute(update(ComplaintSQL), [
+                    {"id": complaint_id, "duplicate_of": duplicate_of} for complaint_id, duplicate_of in links.items()
+                ])
+            deltas = RollupDeltas()
+            for row in rows:
+                deltas.add(row)
+            self.apply_rollups(deltas)
+            self.db.commit()
+        except Exception:
+            for complaint_id in indexed:
+                duplicate_detector.index.remove(complaint_id)
+            raise
+
+        created = [self.to_complaint(row) for row in rows]
+        for complaint in created:
+            complaint.duplicate_of = links.get(complaint.id)
+            dispatch_queue.track(complaint)
+        return created
+
+    @staticmethod
+    def duplicate_fields(complaint_data: ComplaintCreate) -> dict:
+        # MinHash/LSH lookup among open complaints of the same category; well under a millisecond
+        signature = duplicate_detector.signature(complaint_data.description)
+        return {
+            "minhash": signature.tobytes(),
+            "duplicate_of": duplicate_detector.find(complaint_data.category, signature)
+        }
+
+    def apply_rollups(self, deltas: RollupDeltas):
+        # Keeps complaint_rollups in step with complaints; call inside the write's transaction
+        params = deltas.params()
+        if params:
+            self.db.execute(rollup_upsert(self.db.get_bind().dialect.name), params)
+
+    def enrich(self, complaint_data: ComplaintCreate):
+        # Language, classification and the fields derived from them; CPU-bound, no database access
+        self._apply_enrichment(complaint_data, self.categorizer.categorize_and_prioritize(complaint_data.description))
+
+    def enrich_batch(self, complaints: List[ComplaintCreate]) -> list:
+        # Same as enrich, with a single vectorized model call for the whole batch; also returns
+        # each complaint's MinHash signature
+        results = self.categorizer.categorize_batch([complaint.description for complaint in complaints])
+        for complaint_data, categorization_result in zip(complaints, results):
+            self._apply_enrichment(complaint_data, categorization_result)
+        return [duplicate_detector.signature(complaint.description) for complaint in complaints]
+
+    def _apply_enrichment(self, complaint_data: ComplaintCreate, categorization_result: dict):
         if not complaint_data.language:
             complaint_data.language = self.multilingual_service.detect_language(complaint_data.description)
-        
-        categorization_result = self.categorizer.categorize_and_prioritize(complaint_data.description)
-        
+
         complaint_data.category = categorization_result["category"]
         complaint_data.urgency_score = categorization_result["urgency_score"]
         complaint_data.department = categorization_result["department"]
 
-        cost_estimation_result = self.cost_estimation_service.estimate_cost_and_resources(
-            complaint_data.category, 
-            complaint_data.description
-        )
-        complaint_data.estimated_cost = cost_estimation_result["estimated_cost"]
-        complaint_data.required_resources = cost_estimation_result["required_resources"]
-
-        field_officer_suggestions = self.field_officer_service.suggest_action_steps(
-            complaint_data.category,
-            complaint_data.urgency_score,
-            complaint_data.description
-        )
-        complaint_data.suggested_actions = field_officer_suggestions["suggested_actions"]
-        complaint_data.tools_required = field_officer_suggestions["tools_required"]
-        complaint_data.safety_notes = field_officer_suggestions["safety_notes"]
-        complaint_data.sla_hours = field_officer_suggestions["sla_hours"]
-
-        # Convert Pydantic model to SQLAlchemy model
-        db_complaint = ComplaintSQL(**complaint_data.dict(exclude_unset=True))
-        db_complaint.required_resources = ",".join(complaint_data.required_resources)
-        db_complaint.suggested_actions = ",".join(complaint_data.suggested_actions)
-        db_complaint.tools_required = ",".join(complaint_data.tools_required)
-        db_complaint.safety_notes = ",".join(complaint_data.safety_notes)
-
-        self.db.add(db_complaint)
-        self.db.commit()
-        self.db.refresh(db_complaint)
+        for field, value in self.derived_fields(complaint_data.category, complaint_data.urgency_score,
+                                                complaint_data.description).items():
+            setattr(complaint_data, field, value)
 
-        return Complaint(**db_complaint.__dict__)
+    def derived_fields(self, category: str, urgency_score: int, description: str) -> dict:
+        # Everything that follows from the category and urgency; recomputed whenever those change
+        cost_estimation_result = self.cost_estimation_service.estimate_cost_and_resources(category, description)
+        field_officer_suggestions = self.field_officer_service.suggest_action_steps(category, urgency_score, description)
+        return {
+            "estimated_cost": cost_estimation_result["estimated_cost"],
+            "required_resources": cost_estimation_result["required_resources"],
+            "suggested_actions": field_officer_suggestions["suggested_actions"],
+            "tools_required": field_officer_suggestions["tools_required"],
+            "safety_notes": field_officer_suggestions["safety_notes"],
+            "sla_hours": field_officer_suggestions["sla_hours"]
+        }
 
     def get_complaint_by_id(self, complaint_id: int) -> Optional[Complaint]:
-        complaint_data = self.db.query(ComplaintSQL).filter(ComplaintSQL.id == complaint_id).first()
-        if complaint_data:
-            return Complaint(
-                id=complaint_data.id,
-                citizen_id=complaint_data.citizen_id,
-                description=complaint_data.description,
-                language=complaint_data.language,
-                category=complaint_data.category,
-                urgency_score=complaint_data.urgency_score,
-                department=complaint_data.department,
-                estimated_cost=complaint_data.estimated_cost,
-                required_resources=complaint_data.required_resources, # Pydantic validator will handle conversion
-                suggested_actions=complaint_data.suggested_actions, # Pydantic validator will handle conversion
-                tools_required=complaint_data.tools_required, # Pydantic validator will handle conversion
-                safety_notes=complaint_data.safety_notes, # Pydantic validator will handle conversion
-                sla_hours=complaint_data.sla_hours,
-                status=complaint_data.status,
-                created_at=complaint_data.created_at
-            )
-        return None
+        row = self.db.execute(select(*COMPLAINT_COLUMNS).where(ComplaintSQL.id == complaint_id)).first()
+        return self.to_complaint(row) if row else None
 
     def get_all_complaints(self) -> List[Complaint]:
-        all_complaints_data = self.db.query(ComplaintSQL).all()
-        complaints = []
-        for complaint_data in all_complaints_data:
-            complaints.append(Complaint(
-                id=complaint_data.id,
-                citizen_id=complaint_data.citizen_id,
-                description=complaint_data.description,
-                language=complaint_data.language,
-                category=complaint_data.category,
-                urgency_score=complaint_data.urgency_score,
-                department=complaint_data.department,
-                estimated_cost=complaint_data.estimated_cost,
-                required_resources=complaint_data.required_resources, # Pydantic validator will handle conversion
-                suggested_actions=complaint_data.suggested_actions, # Pydantic validator will handle conversion
-                tools_required=complaint_data.tools_required, # Pydantic validator will handle conversion
-                safety_notes=complaint_data.safety_notes, # Pydantic validator will handle conversion
-                sla_hours=complaint_data.sla_hours,
-                status=complaint_data.status,
-                created_at=complaint_data.created_at
-            ))
-        print(f"Complaints from DB (before Pydantic validation): {complaints}") # Debug print
-        return complaints
+        return [self.to_complaint(row) for row in self.db.execute(select(*COMPLAINT_COLUMNS)).all()]
+
+    @staticmethod
+    def encode_cursor(urgency_score: Optional[int], complaint_id: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([urgency_score, complaint_id]).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[Optional[int], int]:
+        try:
+            urgency_score, complaint_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if (urgency_score is not None and not isinstance(urgency_score, int)) or not isinstance(complaint_id, int):
+                raise ValueError
+        except (ValueError, TypeError):
+            raise InvalidCursor("Invalid cursor")
+        return urgency_score, complaint_id
+
+    @staticmethod
+    def _queue_filters(department: Optional[str], status: Optional[str]) -> list:
+        filters = []
+        if department:
+            filters.append(ComplaintSQL.department == department)
+        if status:
+            filters.append(ComplaintSQL.status == status)
+        return filters
+
+    @staticmethod
+    def _queue_scored(filters: list, after: Optional[Tuple[int, int]], limit: int):
+        statement = select(*COMPLAINT_COLUMNS).where(*filters, ComplaintSQL.urgency_score.isnot(None))
+        if after:
+            statement = statement.where(tuple_(ComplaintSQL.urgency_score, ComplaintSQL.id) < after)
+        return statement.order_by(ComplaintSQL.urgency_score.desc(), ComplaintSQL.id.desc()).limit(limit)
+
+    @staticmethod
+    def _queue_unscored(filters: list, before_id: Optional[int], limit: int):
+        statement = select(*COMPLAINT_COLUMNS).where(*filters, ComplaintSQL.urgency_score.is_(None))
+        if before_id is not None:
+            statement = statement.where(ComplaintSQL.id < before_id)
+        return statement.order_by(ComplaintSQL.id.desc()).limit(limit)
+
+    def _queue_page(self, rows: list, limit: int) -> Tuple[List[Complaint], Optional[str]]:
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1].urgency_score, rows[-1].id)
+        return [self.to_complaint(row) for row in rows], next_cursor
+
+    def get_priority_queue(self, department: Optional[str] = None, status: Optional[str] = None,
+                           limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Complaint], Optional[str]]:
+        # Highest urgency first, newest first within a score. Keyset pagination: every page is a
+        # range scan of the matching ix_complaints_queue* index starting right after the cursor,
+        # so page 1000 costs the same as page 1.
+        filters = self._queue_filters(department, status)
+        after_score, after_id = self.decode_cursor(cursor) if cursor else (None, None)
+        rows = []
+        # Scored complaints first; the (rare) unscored ones follow, in id order
+        if cursor is None or after_score is not None:
+            after = (after_score, after_id) if cursor else None
+            rows = list(self.db.execute(self._queue_scored(filters, after, limit + 1)).all())
+        if len(rows) <= limit:
+            before_id = after_id if after_score is None else None
+            rows += self.db.execute(self._queue_unscored(filters, before_id, limit + 1 - len(rows))).all()
+        return self._queue_page(rows, limit)
+
+    @staticmethod
+    def to_complaint(row) -> Complaint:
+        # Rows come straight from typed columns, so the response model is built without
+        # re-running validation; only NULL list columns need the validator's [] default
+        values = dict(zip(COMPLAINT_FIELDS, row))
+        for field in LIST_FIELDS:
+            if values[field] is None:
+                values[field] = []
+        return Complaint.model_construct(**values)
+
+    @staticmethod
+    def _update_statement(complaint_id: int, old_row, values: dict):
+        # Only applies if the complaint still has the values the rollup delta is computed from
+        return (
+            update(ComplaintSQL)
+            .where(ComplaintSQL.id == complaint_id, *rollup_guard(old_row))
+            .values(**values)
+            .returning(*COMPLAINT_COLUMNS, ComplaintSQL.minhash) # to_complaint ignores the trailing minhash
+        )
+
+    @staticmethod
+    def _change_deltas(old_row, new_row) -> RollupDeltas:
+        deltas = RollupDeltas()
+        deltas.add(old_row, -1)
+        deltas.add(new_row)
+        return deltas
+
+    def _update_complaint(self, complaint_id: int, values: dict) -> Optional[Complaint]:
+        while True:
+            old_row = self.db.execute(select(*COMPLAINT_COLUMNS).where(ComplaintSQL.id == complaint_id)).first()
+            if old_row is None:
+                return None
+            row = self.db.execute(self._update_statement(complaint_id, old_row, values)).first()
+            if row is not None:
+                break
+            self.db.rollback() # changed concurrently since we read it; start over from the new values
+        self.apply_rollups(self._change_deltas(old_row, row))
+        self.db.commit()
+        self._track(row)
+        return self.to_complaint(row)
+
+    @staticmethod
+    def _track(row):
+        # Resolved complaints stop attracting duplicates and leave the dispatch queue; reopened ones return
+        duplicate_detector.track(row.id, row.category, row.status, row.duplicate_of, row.minhash)
+        dispatch_queue.track(row)
 
     def update_complaint_status(self, complaint_id: int, new_status: str) -> Optional[Complaint]:
-        db_complaint = self.db.query(ComplaintSQL).filter(ComplaintSQL.id == complaint_id).first()
-        if db_complaint:
-            db_complaint.status = new_status
-            self.db.commit()
-            self.db.refresh(db_complaint)
-            # Convert SQLAlchemy model back to Pydantic model explicitly
-            return Complaint(
-                id=db_complaint.id,
-                citizen_id=db_complaint.citizen_id,
-                description=db_complaint.description,
-                language=db_complaint.language,
-                category=db_complaint.category,
-                urgency_score=db_complaint.urgency_score,
-                department=db_complaint.department,
-                estimated_cost=db_complaint.estimated_cost,
-                required_resources=db_complaint.required_resources,
-                suggested_actions=db_complaint.suggested_actions,
-                tools_required=db_complaint.tools_required,
-                safety_notes=db_complaint.safety_notes,
-                sla_hours=db_complaint.sla_hours,
-                status=db_complaint.status,
-                created_at=db_complaint.created_at
-            )
-        return None
+        return self._update_complaint(complaint_id, {"status": new_status})
+
+    @staticmethod
+    def _priority_values(urgency_score: Optional[int], sla_hours: Optional[int]) -> dict:
+        values = {"urgency_score": urgency_score, "sla_hours": sla_hours}
+        return {name: value for name, value in values.items() if value is not None}
+
+    def reprioritize_complaint(self, complaint_id: int, urgency_score: Optional[int] = None,
+                               sla_hours: Optional[int] = None) -> Optional[Complaint]:
+        # Manual override of the classifier's urgency and/or the SLA; moves the complaint within
+        # its department's dispatch queue in O(log n)
+        return self._update_complaint(complaint_id, self._priority_values(urgency_score, sla_hours))
+
+class AsyncComplaintService:
+    # ComplaintService for async endpoints, by composition: every query and write is the sync
+    # service's own code, run on this AsyncSession's connection through run_sync. Classification
+    # is CPU-bound and runs in the threadpool, where concurrent requests still meet in the micro-batcher.
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # Bound to the session's sync facade, which only reaches the database inside run_sync
+        self.service = ComplaintService(db.sync_session)
+
+    async def _run(self, method: Callable, *args):
+        return await self.db.run_sync(lambda session: method(*args))
+
+    async def create_complaint(self, complaint_data: ComplaintCreate) -> Complaint:
+        await run_in_threadpool(self.service.enrich, complaint_data)
+        return await self._run(self.service.insert_complaint, complaint_data)
+
+    async def create_complaints(self, complaints: List[ComplaintCreate]) -> List[Complaint]:
+        signatures = await run_in_threadpool(self.service.enrich_batch, complaints)
+        return await self._run(self.service.insert_complaints, complaints, signatures)
+
+    async def get_complaint_by_id(self, complaint_id: int) -> Optional[Complaint]:
+        return await self._run(self.service.get_complaint_by_id, complaint_id)
+
+    async def get_all_complaints(self) -> List[Complaint]:
+        return await self._run(self.service.get_all_complaints)
+
+    async def get_priority_queue(self, department: Optional[str] = None, status: Optional[str] = None,
+                                 limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Complaint], Optional[str]]:
+        return await self._run(self.service.get_priority_queue, department, status, limit, cursor)
+
+    async def update_complaint_status(self, complaint_id: int, new_status: str) -> Optional[Complaint]:
+        return await self._run(self.service.update_complaint_status, complaint_id, new_status)
+
+    async def reprioritize_complaint(self, complaint_id: int, urgency_score: Optional[int] = None,
+                                     sla_hours: Optional[int] = None) -> Optional[Complaint]:
+        return await self._run(self.service.reprioritize_complaint, complaint_id, urgency_score, sla_hours)
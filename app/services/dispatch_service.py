@@ -0,0 +1,195 @@
+import heapq
+import math
+import threading
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models.sql_models import ComplaintSQL
+
+# Only complaints nobody has picked up yet are dispatched; duplicates are never dispatched
+DISPATCHABLE_STATUSES = ("pending",)
+NO_DEADLINE = math.inf
+
+
+def sla_deadline(created_at: Optional[datetime], sla_hours: Optional[int]) -> float:
+    # Deadline as a UTC timestamp (created_at is stored as naive UTC); no SLA sorts last
+    if created_at is None or sla_hours is None:
+        return NO_DEADLINE
+    return (created_at + timedelta(hours=sla_hours)).replace(tzinfo=timezone.utc).timestamp()
+
+
+class DispatchQueue:
+    """Indexed binary min-heap of dispatchable complaints per department.
+
+    Order: highest urgency first, then earliest SLA deadline, then lowest id. Entries are slots
+    in flat arrays (complaint id, urgency, deadline, heap position) shared by all departments,
+    and each department's heap is an array of slots. The slot's heap position makes updates
+    and removals O(log n) without searching the heap. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        self.loaded = False
+
+    def _reset(self):
+        self._complaint_ids = array("q")
+        self._urgency = array("l")
+        self._deadline = array("d")
+        self._position = array("q") # index in the department heap; -1 for a free slot
+        self._departments: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        self._slots: Dict[int, int] = {} # complaint id -> slot
+        self._heaps: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _key(self, slot: int) -> Tuple[int, float, int]:
+        return -self._urgency[slot], self._deadline[slot], self._complaint_ids[slot]
+
+    def _swap(self, heap: array, i: int, j: int):
+        heap[i], heap[j] = heap[j], heap[i]
+        self._position[heap[i]] = i
+        self._position[heap[j]] = j
+
+    def _sift_up(self, heap: array, i: int):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self._key(heap[i]) >= self._key(heap[parent]):
+                return
+            self._swap(heap, i, parent)
+            i = parent
+
+    def _sift_down(self, heap: array, i: int):
+        size = len(heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size and self._key(heap[child]) < self._key(heap[smallest]):
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(heap, i, smallest)
+            i = smallest
+
+    def _new_slot(self, complaint_id: int, department: str, urgency_score: int, deadline: float) -> int:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._complaint_ids[slot] = complaint_id
+            self._urgency[slot] = urgency_score
+            self._deadline[slot] = deadline
+            self._departments[slot] = department
+        else:
+            slot = len(self._complaint_ids)
+            self._complaint_ids.append(complaint_id)
+            self._urgency.append(urgency_score)
+            self._deadline.append(deadline)
+            self._position.append(-1)
+            self._departments.append(department)
+        self._slots[complaint_id] = slot
+        return slot
+
+    def _remove(self, complaint_id: int):
+        slot = self._slots.pop(complaint_id, None)
+        if slot is None:
+            return
+        heap = self._heaps[self._departments[slot]]
+        i = self._position[slot]
+        last = heap.pop()
+        if last != slot:
+            heap[i] = last
+            self._position[last] = i
+            self._sift_up(heap, i)
+            self._sift_down(heap, self._position[last])
+        self._position[slot] = -1
+        self._departments[slot] = None
+        self._free_slots.append(slot)
+
+    def upsert(self, complaint_id: int, department: str, urgency_score: Optional[int], deadline: float):
+        urgency_score = urgency_score or 0
+        with self._lock:
+            slot = self._slots.get(complaint_id)
+            if slot is not None and self._departments[slot] != department:
+                self._remove(complaint_id)
+                slot = None
+            if slot is None:
+                slot = self._new_slot(complaint_id, department, urgency_score, deadline)
+                heap = self._heaps.setdefault(department, array("q"))
+                heap.append(slot)
+                self._position[slot] = len(heap) - 1
+                self._sift_up(heap, len(heap) - 1)
+                return
+            self._urgency[slot] = urgency_score
+            self._deadline[slot] = deadline
+            heap = self._heaps[department]
+            self._sift_up(heap, self._position[slot])
+            self._sift_down(heap, self._position[slot])
+
+    def remove(self, complaint_id: int):
+        with self._lock:
+            self._remove(complaint_id)
+
+    def track(self, complaint):
+        # Brings one complaint's entry in line with its stored state; complaint is a Row,
+        # ComplaintSQL or Complaint
+        if (complaint.department and complaint.status in DISPATCHABLE_STATUSES
+                and getattr(complaint, "duplicate_of", None) is None):
+            self.upsert(complaint.id, complaint.department, complaint.urgency_score,
+                        sla_deadline(complaint.created_at, complaint.sla_hours))
+        else:
+            self.remove(complaint.id)
+
+    def next_tasks(self, department: str, limit: int) -> Tuple[int, List[Tuple[int, int, float]]]:
+        # Top `limit` entries without popping them: a best-first walk of the heap tree that only
+        # expands children of entries already taken, O(limit log limit). Returns the queue size too.
+        with self._lock:
+            heap = self._heaps.get(department)
+            if not heap:
+                return 0, []
+            tasks = []
+            frontier = [(self._key(heap[0]), 0)]
+            while frontier and len(tasks) < limit:
+                _, i = heapq.heappop(frontier)
+                slot = heap[i]
+                tasks.append((self._complaint_ids[slot], self._urgency[slot], self._deadline[slot]))
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (self._key(heap[child]), child))
+            return len(heap), tasks
+
+    def sizes(self) -> Dict[str, int]:
+        with self._lock:
+            return {department: len(heap) for department, heap in self._heaps.items() if heap}
+
+    def load(self, db: Session):
+        # Bulk rebuild: fill the slot arrays, then heapify each department in O(n)
+        with self._lock:
+            self._reset()
+            rows = db.execute(
+                select(ComplaintSQL.id, ComplaintSQL.department, ComplaintSQL.urgency_score,
+                       ComplaintSQL.created_at, ComplaintSQL.sla_hours)
+                .where(
+                    ComplaintSQL.status.in_(DISPATCHABLE_STATUSES),
+                    ComplaintSQL.duplicate_of.is_(None),
+                    ComplaintSQL.department.isnot(None)
+                )
+                .execution_options(yield_per=5000)
+            )
+            for complaint_id, department, urgency_score, created_at, sla_hours in rows:
+                slot = self._new_slot(complaint_id, department, urgency_score or 0, sla_deadline(created_at, sla_hours))
+                self._heaps.setdefault(department, array("q")).append(slot)
+            for heap in self._heaps.values():
+                for i, slot in enumerate(heap):
+                    self._position[slot] = i
+                for i in reversed(range(len(heap) // 2)):
+                    self._sift_down(heap, i)
+            self.loaded = True
+
+
+# Shared by every request; loaded during application startup
+dispatch_queue = DispatchQueue()
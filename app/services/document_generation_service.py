@@ -1,5 +1,6 @@
 from jinja2 import Environment, FileSystemLoader
 from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..db import get_db
 from ..models.document_models import RTIDocument, SchemeApplication, OfficialNotice, WorkOrder
@@ -115,3 +116,21 @@ class DocumentGenerationService:
         return template.render(render_data)
 
 
+class AsyncDocumentGenerationService:
+    # DocumentGenerationService for async endpoints: the complaint and circular lookups behind each
+    # document run on this AsyncSession's connection through run_sync
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.service = DocumentGenerationService(db.sync_session)
+
+    async def generate_rti_document(self, data: RTIDocument) -> str:
+        return await self.db.run_sync(lambda session: self.service.generate_rti_document(data))
+
+    async def generate_scheme_application(self, data: SchemeApplication) -> str:
+        return await self.db.run_sync(lambda session: self.service.generate_scheme_application(data))
+
+    async def generate_official_notice(self, data: OfficialNotice) -> str:
+        return await self.db.run_sync(lambda session: self.service.generate_official_notice(data))
+
+    async def generate_work_order(self, data: WorkOrder) -> str:
+        return await self.db.run_sync(lambda session: self.service.generate_work_order(data))
@@ -0,0 +1,80 @@
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..migrations import data_migration
+from ..ml.minhash import LSHIndex, MinHasher
+from ..models.sql_models import ComplaintSQL
+
+# Complaints in these states no longer attract duplicates
+CLOSED_STATUSES = ("resolved",)
+
+
+class DuplicateDetector:
+    # Process-wide MinHash/LSH index over open complaints that are not themselves duplicates,
+    # partitioned by category, so a new complaint is linked to the original it repeats.
+    # Signatures are stored on complaints.minhash; the index is rebuilt from them at startup.
+    def __init__(self):
+        self.hasher = MinHasher()
+        self.index = LSHIndex()
+        self.loaded = False
+
+    def signature(self, description: Optional[str]) -> np.ndarray:
+        return self.hasher.signature(description or "")
+
+    def find(self, category: Optional[str], signature: np.ndarray) -> Optional[int]:
+        match = self.index.query(category or "", signature, settings.duplicate_similarity_threshold)
+        return match[0] if match else None
+
+    def track(self, complaint_id: int, category: Optional[str], status: Optional[str],
+              duplicate_of: Optional[int], minhash: Optional[bytes]):
+        # Brings one complaint's index entry in line with its stored state
+        if minhash is None or duplicate_of is not None or status in CLOSED_STATUSES:
+            self.index.remove(complaint_id)
+        else:
+            self.index.add(complaint_id, category or "", np.frombuffer(minhash, dtype=np.uint32))
+
+    def load(self, db: Session):
+        self.index.clear()
+        rows = db.execute(
+            select(ComplaintSQL.id, ComplaintSQL.category, ComplaintSQL.minhash)
+            .where(
+                ComplaintSQL.minhash.isnot(None),
+                ComplaintSQL.duplicate_of.is_(None),
+                or_(ComplaintSQL.status.is_(None), ComplaintSQL.status.notin_(CLOSED_STATUSES))
+            )
+            .execution_options(yield_per=5000)
+        )
+        for complaint_id, category, minhash in rows:
+            self.index.add(complaint_id, category or "", np.frombuffer(minhash, dtype=np.uint32))
+        self.loaded = True
+
+
+@data_migration("0003_complaint_minhash")
+def backfill_complaint_minhash(conn):
+    # Signatures for complaints stored before duplicate detection existed; they don't get linked
+    # retroactively, but new complaints can now be matched against them
+    complaints = ComplaintSQL.__table__
+    statement = update(complaints).where(complaints.c.id == bindparam("complaint_id")).values(minhash=bindparam("signature"))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(complaints.c.id, complaints.c.description)
+            .where(complaints.c.id > last_id, complaints.c.minhash.is_(None))
+            .order_by(complaints.c.id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            return
+        conn.execute(statement, [
+            {"complaint_id": complaint_id, "signature": duplicate_detector.signature(description).tobytes()}
+            for complaint_id, description in rows
+        ])
+        last_id = rows[-1].id
+
+
+# Shared by every request; loaded during application startup
+duplicate_detector = DuplicateDetector()
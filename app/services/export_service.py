@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+
+from sqlalchemy import select
+
+from ..db import AsyncSessionLocal
+from ..models.sql_models import CircularSQL, ComplaintSQL
+
+# Rows fetched from the server-side cursor, and written to the response, per chunk
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+COMPLAINT_COLUMNS = tuple(
+    ComplaintSQL.__table__.c[name] for name in (
+        "id", "created_at", "citizen_id", "status", "department", "category", "urgency_score", "language",
+        "description", "estimated_cost", "sla_hours", "required_resources", "suggested_actions",
+        "tools_required", "safety_notes", "duplicate_of"
+    )
+)
+CIRCULAR_COLUMNS = tuple(
+    CircularSQL.__table__.c[name] for name in (
+        "id", "filename", "language", "content_summary", "extracted_rules", "eligibility_criteria",
+        "deadlines", "contact_info", "page_count", "content_sha256", "uploaded_at"
+    )
+)
+# Text columns that hold a JSON document; NDJSON embeds the document itself rather than its text
+JSON_TEXT_COLUMNS = ("extracted_rules",)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _json_text(value):
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return [] # unreadable rules count as none, as in the Circular model
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False) # list columns stay machine-readable in one cell
+    return value
+
+
+class ExportService:
+    """Streams query results as NDJSON or CSV, one chunk of rows at a time.
+
+    Rows come off a server-side cursor (yield_per), so memory use is bounded by the chunk size
+    and not the export size. The session is opened by the stream itself, because the response
+    body is produced after the endpoint (and its request-scoped session) has returned.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, chunk_rows: int = EXPORT_CHUNK_ROWS):
+        self.session_factory = session_factory
+        self.chunk_rows = chunk_rows
+
+    @staticmethod
+    def complaints_statement(department: Optional[str] = None, status: Optional[str] = None,
+                             created_from: Optional[datetime] = None, created_to: Optional[datetime] = None):
+        # created_from is inclusive and created_to exclusive, so consecutive months never overlap
+        statement = select(*COMPLAINT_COLUMNS)
+        if department:
+            statement = statement.where(ComplaintSQL.department == department)
+        if status:
+            statement = statement.where(ComplaintSQL.status == status)
+        if created_from:
+            statement = statement.where(ComplaintSQL.created_at >= created_from)
+        if created_to:
+            statement = statement.where(ComplaintSQL.created_at < created_to)
+        return statement.order_by(ComplaintSQL.id)
+
+    @staticmethod
+    def circulars_statement(language: Optional[str] = None, uploaded_from: Optional[datetime] = None,
+                            uploaded_to: Optional[datetime] = None):
+        statement = select(*CIRCULAR_COLUMNS)
+        if language:
+            statement = statement.where(CircularSQL.language == language)
+        if uploaded_from:
+            statement = statement.where(CircularSQL.uploaded_at >= uploaded_from)
+        if uploaded_to:
+            statement = statement.where(CircularSQL.uploaded_at < uploaded_to)
+        return statement.order_by(CircularSQL.id)
+
+    async def stream(self, statement, export_format: str) -> AsyncIterator[str]:
+        async with self.session_factory() as db:
+            result = await db.stream(statement.execution_options(yield_per=self.chunk_rows))
+            fields = list(result.keys())
+            json_fields = [field for field in fields if field in JSON_TEXT_COLUMNS]
+            if export_format == "csv":
+                yield self._csv_chunk([fields])
+            async for rows in result.partitions():
+                if export_format == "csv":
+                    yield self._csv_chunk([_csv_value(value) for value in row] for row in rows)
+                else:
+                    yield self._ndjson_chunk(fields, rows, json_fields)
+
+    @staticmethod
+    def _ndjson_chunk(fields: Sequence[str], rows, json_fields: Sequence[str] = ()) -> str:
+        lines = []
+        for row in rows:
+            record = dict(zip(fields, row))
+            for field in json_fields:
+                record[field] = _json_text(record[field])
+            lines.append(json.dumps(record, default=_json_default, ensure_ascii=False) + "\n")
+        return "".join(lines)
+
+    @staticmethod
+    def _csv_chunk(rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
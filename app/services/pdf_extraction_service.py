@@ -0,0 +1,324 @@
+import fitz  # PyMuPDF
+import pytesseract # python-tesseract
+from PIL import Image
+import os
+import re
+import json
+import hashlib
+import tempfile
+import atexit
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from multiprocessing import shared_memory
+from typing import List, Dict, Any, Union, Optional, Callable, Iterable
+
+# A page whose text layer has fewer characters than this is treated as scanned and OCR'd
+MIN_TEXT_LAYER_CHARS = 20
+# Documents shorter than this are extracted inline; spinning up the pool costs more than it saves
+PARALLEL_PAGE_THRESHOLD = 8
+# Pages handed to a worker per task. Small enough to balance OCR-heavy ranges, large enough
+# that each worker doesn't re-open the document for every single page.
+PAGES_PER_TASK = 8
+MAX_WORKERS = os.cpu_count() or 1
+
+OCR_LANG = "eng"
+# Scanned pages are rasterized at LOW_OCR_DPI first and only re-rendered at HIGH_OCR_DPI when
+# Tesseract's mean word confidence comes back below MIN_OCR_CONFIDENCE
+LOW_OCR_DPI = 150
+HIGH_OCR_DPI = 300
+MIN_OCR_CONFIDENCE = 70.0
+# OCR results keyed by rendered page image hash + language; plain files so pool workers can share it
+OCR_CACHE_DIR = "data/ocr_cache"
+
+# A filesystem path or the raw PDF bytes (uploads are parsed from memory, never written to disk)
+PdfSource = Union[str, bytes]
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _open_document(source: PdfSource) -> fitz.Document:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+class OcrCache:
+    def __init__(self, root: str = OCR_CACHE_DIR):
+        self.root = root
+
+    def _path(self, image_hash: str, lang: str) -> str:
+        return os.path.join(self.root, image_hash[:2], f"{image_hash}.{lang}.json")
+
+    def get(self, image_hash: str, lang: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(image_hash, lang), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, image_hash: str, lang: str, result: Dict[str, Any]):
+        path = self._path(image_hash, lang)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so a concurrent reader in another worker never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+
+
+_ocr_cache = OcrCache()
+
+
+def _render(page: fitz.Page, dpi: int) -> fitz.Pixmap:
+    # Grayscale without alpha: a third of the RGB bytes and exactly what Tesseract binarizes anyway
+    return page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+
+
+def _ocr_pixmap(pix: fitz.Pixmap, lang: str) -> Dict[str, Any]:
+    # The raw samples go straight into PIL, no PNG encode/decode round trip
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    data = pytesseract.image_to_data(img, lang=lang, output_type=pytesseract.Output.DICT)
+
+    lines: Dict[tuple, List[str]] = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if confidence < 0 or not word.strip():
+            continue
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+        confidences.append(confidence)
+
+    return {
+        "text": "\n".join(" ".join(words) for words in lines.values()),
+        "confidence": sum(confidences) / len(confidences) if confidences else 0.0
+    }
+
+
+def _ocr_page(page: fitz.Page, lang: str = OCR_LANG) -> Dict[str, Any]:
+    pix = _render(page, LOW_OCR_DPI)
+    image_hash = hashlib.sha256(pix.samples_mv).hexdigest()
+    cached = _ocr_cache.get(image_hash, lang)
+    if cached is not None:
+        return cached
+
+    result = {**_ocr_pixmap(pix, lang), "dpi": LOW_OCR_DPI}
+    if result["confidence"] < MIN_OCR_CONFIDENCE:
+        retry = {**_ocr_pixmap(_render(page, HIGH_OCR_DPI), lang), "dpi": HIGH_OCR_DPI}
+        if retry["confidence"] > result["confidence"]:
+            result = retry
+
+    _ocr_cache.put(image_hash, lang, result)
+    return result
+
+
+def _extract_page(page: fitz.Page) -> Dict[str, Any]:
+    text = page.get_text()
+    if len(text.strip()) >= MIN_TEXT_LAYER_CHARS:
+        return {"page": page.number, "text": text, "method": "text"}
+
+    # No usable text layer on this page (scanned image) - fall back to OCR
+    ocr_text = _ocr_page(page)["text"]
+    if len(ocr_text.strip()) > len(text.strip()):
+        return {"page": page.number, "text": ocr_text, "method": "ocr"}
+    return {"page": page.number, "text": text, "method": "text"}
+
+
+def _extract_page_range(source: PdfSource, page_numbers: List[int]) -> List[Dict[str, Any]]:
+    # Runs inside a pool worker: each worker opens its own handle, fitz documents can't be pickled
+    doc = _open_document(source)
+    try:
+        return [_extract_page(doc.load_page(page_num)) for page_num in page_numbers]
+    finally:
+        doc.close()
+
+
+def _in_worker(extract_range: Callable[..., List[Dict[str, Any]]], *args) -> List[Dict[str, Any]]:
+    # Worker exceptions travel back pickled; some (e.g. pytesseract's TesseractNotFoundError) can't
+    # be unpickled, which would break the whole pool, so they're re-raised as a plain RuntimeError
+    try:
+        return extract_range(*args)
+    except Exception as e:
+        raise RuntimeError(f"{e.__class__.__name__}: {e}") from None
+
+
+def _extract_shared_page_range(shm_name: str, size: int, page_numbers: List[int]) -> List[Dict[str, Any]]:
+    # In-memory uploads are published once in shared memory instead of being pickled to every task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffer = shm.buf[:size]
+    try:
+        return _extract_page_range(buffer, page_numbers)
+    finally:
+        buffer.release()
+        shm.close()
+
+
+# An indirect reference inside a PDF object's source, e.g. "12 0 R"
+_OBJECT_REF = re.compile(r"\b(\d+) (\d+) R\b")
+# Back-references to the page tree; following them would hash every page of the document
+_PARENT_REF = re.compile(r"/(?:Parent|P)\s+\d+ \d+ R\b")
+
+
+def _object_digest(doc: fitz.Document, xref: int, memo: Dict[int, str], active: set) -> str:
+    # Hash of a PDF object and, recursively, of every object it references, so two objects with
+    # the same content hash the same across documents whatever their xref numbers are
+    if xref in memo:
+        return memo[xref]
+    if xref in active:
+        return "cycle"
+    active.add(xref)
+    digest = hashlib.sha256()
+    digest.update(_resolve_refs(doc, doc.xref_object(xref, compressed=True), memo, active).encode())
+    if doc.xref_is_stream(xref):
+        digest.update(doc.xref_stream_raw(xref) or b"")
+    active.discard(xref)
+    memo[xref] = digest.hexdigest()
+    return memo[xref]
+
+
+def _resolve_refs(doc: fitz.Document, source: str, memo: Dict[int, str], active: set) -> str:
+    return _OBJECT_REF.sub(
+        lambda ref: _object_digest(doc, int(ref.group(1)), memo, active), _PARENT_REF.sub("", source)
+    )
+
+
+def _page_resources(doc: fitz.Document, page: fitz.Page) -> str:
+    # /Resources may be inherited from an ancestor in the page tree
+    xref = page.xref
+    while xref:
+        kind, value = doc.xref_get_key(xref, "Resources")
+        if kind != "null":
+            return value
+        kind, value = doc.xref_get_key(xref, "Parent")
+        xref = int(value.split()[0]) if kind == "xref" else 0
+    return ""
+
+
+def page_fingerprint(doc: fitz.Document, page: fitz.Page, memo: Optional[Dict[int, str]] = None) -> str:
+    # Hash of what the page draws: its content stream plus everything its /Resources reach - Form
+    # XObjects and their own resources, images, fonts with their programs and ToUnicode maps, color
+    # spaces. A content stream alone is not enough: "/Fm0 Do" or glyph ids in a subset font say
+    # nothing about the text drawn. Pass one memo for all pages of a document so shared fonts and
+    # XObjects are only hashed once.
+    memo = {} if memo is None else memo
+    digest = hashlib.sha256()
+    digest.update(repr((tuple(page.rect), page.rotation)).encode())
+    digest.update(page.read_contents())
+    digest.update(_resolve_refs(doc, _page_resources(doc, page), memo, set()).encode())
+    return digest.hexdigest()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+    return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    # A worker died (segfault, OOM kill) and the pool refuses new work; the next caller gets a fresh one
+    global _executor
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+atexit.register(shutdown_executor)
+
+
+class PdfExtractionService:
+    def __init__(self, parallel_threshold: int = PARALLEL_PAGE_THRESHOLD, pages_per_task: int = PAGES_PER_TASK):
+        self.parallel_threshold = parallel_threshold
+        self.pages_per_task = pages_per_task
+
+    def extract_pages(
+        self,
+        source: PdfSource,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        cache=None
+    ) -> List[Dict[str, Any]]:
+        """Extract every page of a PDF, choosing text layer or OCR per page.
+
+        Returns one dict per page ({"page", "text", "method", "fingerprint"}) in page order.
+        `cache` is any object with get_many(fingerprints) -> {fingerprint: page} and
+        put_many(pages); pages found in it are reused instead of being extracted again.
+        """
+        doc = _open_document(source)
+        try:
+            page_count = doc.page_count
+            memo: Dict[int, str] = {}
+            fingerprints = [page_fingerprint(doc, doc.load_page(page_num), memo) for page_num in range(page_count)]
+        finally:
+            doc.close()
+
+        cached = cache.get_many(set(fingerprints)) if cache is not None else {}
+        results: Dict[int, Dict[str, Any]] = {}
+        for page_num, fingerprint in enumerate(fingerprints):
+            if fingerprint in cached:
+                results[page_num] = {**cached[fingerprint], "page": page_num}
+        missing = [page_num for page_num in range(page_count) if page_num not in results]
+
+        def report():
+            if on_progress:
+                on_progress(len(results), page_count)
+
+        report()
+        extracted = []
+        for chunk in self._extract_missing(source, missing):
+            for page in chunk:
+                page["fingerprint"] = fingerprints[page["page"]]
+                results[page["page"]] = page
+            extracted.extend(chunk)
+            report()
+
+        if cache is not None and extracted:
+            cache.put_many(extracted)
+        return [results[page_num] for page_num in range(page_count)]
+
+    def _extract_missing(self, source: PdfSource, page_numbers: List[int]) -> Iterable[List[Dict[str, Any]]]:
+        if not page_numbers:
+            return
+        if len(page_numbers) < self.parallel_threshold or MAX_WORKERS < 2:
+            yield _extract_page_range(source, page_numbers)
+            return
+
+        shm = None
+        if isinstance(source, str):
+            extract_range = partial(_extract_page_range, source)
+        else:
+            shm = shared_memory.SharedMemory(create=True, size=len(source))
+            shm.buf[:len(source)] = source
+            extract_range = partial(_extract_shared_page_range, shm.name, len(source))
+
+        chunks = {
+            i: page_numbers[i:i + self.pages_per_task] for i in range(0, len(page_numbers), self.pages_per_task)
+        }
+        try:
+            # A broken pool is replaced and the chunks not yet returned are retried once
+            for attempt in range(2):
+                executor = _get_executor()
+                try:
+                    futures = {executor.submit(partial(_in_worker, extract_range), chunk): i for i, chunk in chunks.items()}
+                    for future in as_completed(futures):
+                        pages = future.result()
+                        del chunks[futures[future]]
+                        yield pages
+                    return
+                except BrokenProcessPool:
+                    _discard_executor(executor)
+                    if attempt:
+                        raise
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def extract_text(self, source: PdfSource) -> str:
+        return "\n".join(page["text"] for page in self.extract_pages(source))
@@ -1,75 +1,164 @@
-import fitz  # PyMuPDF
-import pytesseract # python-tesseract
-from PIL import Image
-import io
 import re
 import json
+import os
+import hashlib
+import zlib
 
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..models.circular_model import Circular, CircularCreate, ExtractedRule
-from ..models.sql_models import CircularSQL
+from sqlalchemy.exc import IntegrityError
+from ..models.circular_model import Circular, CircularCreate, ExtractedRule, CircularPage, CircularPages
+from ..models.sql_models import CircularSQL, PageExtractionSQL, CircularPageSQL
 from ..services.multilingual_service import MultilingualService
-from typing import List, Optional
+from ..services.pdf_extraction_service import PdfExtractionService, PdfSource
+from ..services.circular_search_service import CircularSearchService
+from ..pdf_parser import CircularFactExtractor
+from typing import List, Optional, Callable, Dict, Any, Set, Union, Iterable
+
+# Characters from the start of a circular used for language detection and the summary
+NLP_HEAD_CHARS = 5000
+# Upper bound on pages returned by one page-range request
+MAX_PAGES_PER_REQUEST = 50
+
+class PageExtractionCache:
+    # Persistent per-page extraction results, so a re-uploaded circular with a few edited pages
+    # only re-extracts (and re-OCRs) the pages that actually changed
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_many(self, fingerprints: Set[str]) -> Dict[str, Dict[str, Any]]:
+        rows = self.db.query(PageExtractionSQL).filter(PageExtractionSQL.fingerprint.in_(fingerprints)).all()
+        return {row.fingerprint: {"text": row.text, "method": row.method, "fingerprint": row.fingerprint} for row in rows}
+
+    def put_many(self, pages: List[Dict[str, Any]]):
+        unique_pages = {page["fingerprint"]: page for page in pages}
+        if not unique_pages:
+            return
+        table = PageExtractionSQL.__table__
+        dialect_insert = postgresql.insert if self.db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        # A page another ingestion job cached first is skipped; its result is just as good, and the
+        # rest of the batch is still stored
+        self.db.execute(dialect_insert(table).on_conflict_do_nothing(index_elements=[table.c.fingerprint]), [
+            {"fingerprint": fingerprint, "text": page["text"], "method": page["method"]}
+            for fingerprint, page in unique_pages.items()
+        ])
+        self.db.commit()
 
 class PdfProcessingService:
     def __init__(self, db: Session):
         self.db = db
         self.multilingual_service = MultilingualService()
+        self.extraction_service = PdfExtractionService()
+
+    def extract_pages_from_pdf(self, pdf_source: PdfSource, on_progress: Optional[Callable[[int, int], None]] = None) -> List[str]:
+        # pdf_source is a path or the raw PDF bytes; uploads are parsed straight from memory.
+        # Pages are fanned out across the extraction process pool and OCR'd individually when scanned
+        pages = self.extraction_service.extract_pages(
+            pdf_source, on_progress=on_progress, cache=PageExtractionCache(self.db)
+        )
+        return [page["text"] for page in pages]
+
+    def extract_text_from_pdf(self, pdf_source: PdfSource, on_progress: Optional[Callable[[int, int], None]] = None) -> str:
+        return "\n".join(self.extract_pages_from_pdf(pdf_source, on_progress=on_progress))
+
+    def process_circular_nlp(self, pages: Union[str, Iterable[str]]) -> dict:
+        if isinstance(pages, str):
+            pages = [pages]
+
+        # Deadlines, eligibility and contacts come from one streaming pass over the pages;
+        # language detection and the summary only need the opening text
+        extractor = CircularFactExtractor()
+        head = ""
+        for page_text in pages:
+            extractor.feed(page_text + "\n")
+            if len(head) < NLP_HEAD_CHARS:
+                head += page_text + "\n"
+        facts = extractor.close()
+
+        detected_language = self.multilingual_service.detect_language(head)
+        content_summary = self.multilingual_service.summarize_text(head, detected_language)
 
-    def extract_text_from_pdf(self, pdf_file_path: str) -> str:
-        doc = fitz.open(pdf_file_path)
-        text = ""
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            text += page.get_text()
-            
-            if not text.strip():
-                pix = page.get_pixmap()
-                img = Image.open(io.BytesIO(pix.tobytes()))
-                text += pytesseract.image_to_string(img)
-        doc.close()
-        return text
-
-    def process_circular_nlp(self, text: str) -> dict:
-        detected_language = self.multilingual_service.detect_language(text)
-        content_summary = self.multilingual_service.summarize_text(text, detected_language)
-        
         extracted_rules: List[ExtractedRule] = [
-            ExtractedRule(rule_text="Rule 1: All citizens must apply by a certain date.", keywords=["apply", "date"]),
-            ExtractedRule(rule_text="Rule 2: Eligibility requires proof of residency.", keywords=["eligibility", "residency"])
+            ExtractedRule(rule_text=clause, keywords=["eligibility"]) for clause in facts["eligibility"]
+        ] + [
+            ExtractedRule(rule_text=f"Apply on or before {deadline}", keywords=["deadline", deadline])
+            for deadline in facts["deadlines"]
         ]
-        eligibility_criteria = "Dummy eligibility: Must be a resident of the city."
-        deadlines = "Dummy deadline: December 31, 2025."
+        contacts = facts["emails"] + facts["phones"]
 
         return {
             "content_summary": content_summary,
             "language": detected_language,
             "extracted_rules": extracted_rules,
-            "eligibility_criteria": eligibility_criteria,
-            "deadlines": deadlines
+            "eligibility_criteria": "\n".join(facts["eligibility"]) or None,
+            "deadlines": ", ".join(facts["deadlines"]) or None,
+            "contact_info": ", ".join(contacts) or None
         }
 
+    @staticmethod
+    def safe_filename(filename: str) -> str:
+        # The client-supplied name is only ever stored as a label, never used as a path
+        return os.path.basename(filename.replace("\\", "/")) or "circular.pdf"
+
+    @staticmethod
+    def content_hash(pdf_content: bytes) -> str:
+        return hashlib.sha256(pdf_content).hexdigest()
+
+    def get_circular_by_hash(self, content_sha256: str) -> Optional[Circular]:
+        circular_data = self.db.query(CircularSQL).filter(CircularSQL.content_sha256 == content_sha256).first()
+        if circular_data:
+            return Circular(**circular_data.__dict__)
+        return None
+
     def save_circular_data(self, filename: str, pdf_content: bytes) -> Circular:
-        temp_pdf_path = f"data/{filename}"
-        with open(temp_pdf_path, "wb") as f:
-            f.write(pdf_content)
+        content_sha256 = self.content_hash(pdf_content)
+        existing = self.get_circular_by_hash(content_sha256)
+        if existing:
+            return existing
 
-        extracted_text = self.extract_text_from_pdf(temp_pdf_path)
-        nlp_results = self.process_circular_nlp(extracted_text)
+        pages = self.extract_pages_from_pdf(pdf_content)
+        nlp_results = self.process_circular_nlp(pages)
+        return self.persist_circular(filename, nlp_results, content_sha256, pages)
 
+    def persist_circular(
+        self,
+        filename: str,
+        nlp_results: dict,
+        content_sha256: Optional[str] = None,
+        pages: Optional[List[str]] = None
+    ) -> Circular:
         circular_data = CircularCreate(
-            filename=filename,
+            filename=self.safe_filename(filename),
             content_summary=nlp_results["content_summary"],
             language=nlp_results["language"],
             extracted_rules=nlp_results["extracted_rules"],
             eligibility_criteria=nlp_results["eligibility_criteria"],
-            deadlines=nlp_results["deadlines"]
+            deadlines=nlp_results["deadlines"],
+            contact_info=nlp_results.get("contact_info"),
+            page_count=len(pages) if pages is not None else None
         )
 
-        db_circular = CircularSQL(**circular_data.to_sql_dict())
+        db_circular = CircularSQL(**circular_data.to_sql_dict(), content_sha256=content_sha256)
 
         self.db.add(db_circular)
-        self.db.commit()
+        try:
+            self.db.flush() # assigns the id the page store and search index rows are keyed on
+            if pages:
+                self.db.bulk_insert_mappings(CircularPageSQL, [
+                    {"circular_id": db_circular.id, "page_number": number, "text": zlib.compress(page_text.encode("utf-8"))}
+                    for number, page_text in enumerate(pages, start=1)
+                ])
+            CircularSearchService(self.db).index_circular(db_circular, pages)
+            self.db.commit()
+        except IntegrityError:
+            # The same PDF was ingested concurrently; keep the row that won
+            self.db.rollback()
+            existing = self.get_circular_by_hash(content_sha256) if content_sha256 else None
+            if existing is None:
+                raise
+            return existing
         self.db.refresh(db_circular)
 
         return Circular(**db_circular.__dict__)
@@ -84,6 +173,78 @@ class PdfProcessingService:
             return Circular(**circular_dict)
         return None
 
+    def get_circular_pages(self, circular_id: int, from_page: int, to_page: Optional[int] = None) -> Optional[CircularPages]:
+        # Only the page count is read from the circular itself; page text is fetched for the range alone
+        page_count = self.db.execute(self._page_count_statement(circular_id)).first()
+        if page_count is None:
+            return None
+        page_count = page_count[0] or 0
+        last_page = self._last_page(page_count, from_page, to_page)
+        rows = self.db.execute(self._page_range_statement(circular_id, from_page, last_page)).all()
+        return self._circular_pages(circular_id, page_count, from_page, last_page, rows)
+
+    @staticmethod
+    def _page_count_statement(circular_id: int):
+        return select(CircularSQL.page_count).where(CircularSQL.id == circular_id)
+
+    @staticmethod
+    def _last_page(page_count: int, from_page: int, to_page: Optional[int]) -> int:
+        last_page = from_page + MAX_PAGES_PER_REQUEST - 1
+        if to_page is not None:
+            last_page = min(last_page, to_page)
+        return min(last_page, page_count)
+
+    @staticmethod
+    def _page_range_statement(circular_id: int, from_page: int, last_page: int):
+        return (
+            select(CircularPageSQL.page_number, CircularPageSQL.text)
+            .where(
+                CircularPageSQL.circular_id == circular_id,
+                CircularPageSQL.page_number >= from_page,
+                CircularPageSQL.page_number <= last_page
+            )
+            .order_by(CircularPageSQL.page_number)
+        )
+
+    @staticmethod
+    def _circular_pages(circular_id: int, page_count: int, from_page: int, last_page: int, rows) -> CircularPages:
+        return CircularPages(
+            circular_id=circular_id,
+            page_count=page_count,
+            from_page=from_page,
+            to_page=max(last_page, from_page - 1),
+            next_from=last_page + 1 if last_page < page_count else None,
+            pages=[CircularPage(page=number, text=zlib.decompress(text).decode("utf-8")) for number, text in rows]
+        )
+
     def get_all_circulars(self) -> List[Circular]:
         circulars_data = self.db.query(CircularSQL).all()
         return [Circular(**circular_data.__dict__) for circular_data in circulars_data]
+
+class AsyncPdfProcessingService:
+    # Read paths for async endpoints, by composition: PdfProcessingService's own queries run on this
+    # AsyncSession's connection through run_sync. Ingestion stays on the sync service: it runs on the
+    # worker pool, where blocking on the database costs no event-loop time.
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # Bound to the session's sync facade, which only reaches the database inside run_sync
+        self.service = PdfProcessingService(db.sync_session)
+
+    async def _run(self, method: Callable, *args):
+        return await self.db.run_sync(lambda session: method(*args))
+
+    async def get_circular_by_hash(self, content_sha256: str) -> Optional[Circular]:
+        return await self._run(self.service.get_circular_by_hash, content_sha256)
+
+    async def get_circular_by_id(self, circular_id: int) -> Optional[Circular]:
+        return await self._run(self.service.get_circular_by_id, circular_id)
+
+    async def get_circular_pages(self, circular_id: int, from_page: int, to_page: Optional[int] = None) -> Optional[CircularPages]:
+        return await self._run(self.service.get_circular_pages, circular_id, from_page, to_page)
+
+    async def get_all_circulars(self) -> List[Circular]:
+        return await self._run(self.service.get_all_circulars)
+
+    async def search(self, query: str, page: int = 1, page_size: int = 20):
+        # The FTS5/tsvector SQL lives in CircularSearchService
+        return await self.db.run_sync(lambda session: CircularSearchService(session).search(query, page, page_size))
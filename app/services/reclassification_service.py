@@ -0,0 +1,273 @@
+"""
+Re-runs complaint classification over stored complaints after a model deploy.
+
+    python -m app.services.reclassification_service [--chunk-size 500] [--duty-cycle 0.5] [--restart]
+
+Complaints are read in id order, one keyset chunk at a time, and each chunk is classified with a
+single batched model call. Changed rows are written back in one transaction per chunk, each UPDATE
+guarded on the values it was computed from; a complaint changed concurrently (e.g. by a status
+update from the API) is re-read and classified again. The last processed id is checkpointed, so
+an interrupted run resumes where it stopped. A run started under a different model version starts
+over from the first complaint.
+
+The API process follows the checkpoint (ReclassificationFollower) and re-tracks each newly processed
+id range in its duplicate index and dispatch queue, so neither keeps serving the old categories,
+departments or priorities.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..models.categorization_model import categorizer
+from ..models.sql_models import ComplaintSQL
+from .analytics_service import ROLLUP_SOURCE_COLUMNS, RollupDeltas, rollup_guard
+from .complaint_service import ComplaintService
+from .dispatch_service import dispatch_queue
+from .duplicate_detection_service import duplicate_detector
+
+CHECKPOINT_PATH = "data/reclassify_checkpoint.json"
+CHUNK_SIZE = 500
+# Fraction of wall time spent working; the rest is spent sleeping so the API keeps the database
+DUTY_CYCLE = 0.5
+# How often the API checks the checkpoint for newly reclassified complaints
+FOLLOW_INTERVAL_SECONDS = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+def load_checkpoint(checkpoint_path: str = CHECKPOINT_PATH) -> Optional[Dict]:
+    try:
+        with open(checkpoint_path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def retrack_complaints(db: Session, after_id: int, up_to_id: int) -> int:
+    # Brings the duplicate index and dispatch queue entries of complaints after_id < id <= up_to_id
+    # in line with their stored state; returns the number of complaints read
+    rows = db.execute(
+        select(ComplaintSQL.id, ComplaintSQL.category, ComplaintSQL.department, ComplaintSQL.urgency_score,
+               ComplaintSQL.status, ComplaintSQL.duplicate_of, ComplaintSQL.minhash, ComplaintSQL.created_at,
+               ComplaintSQL.sla_hours)
+        .where(ComplaintSQL.id > after_id, ComplaintSQL.id <= up_to_id)
+        .execution_options(yield_per=5000)
+    )
+    count = 0
+    for row in rows:
+        duplicate_detector.track(row.id, row.category, row.status, row.duplicate_of, row.minhash)
+        dispatch_queue.track(row)
+        count += 1
+    return count
+
+
+class ReclassificationFollower:
+    # Runs in the API process. The reclassification job is a separate process, so the API's in-memory
+    # duplicate index and dispatch queue can't see its writes; this polls the checkpoint and re-tracks
+    # every id range the job has committed since the last poll. A run that starts over (new model
+    # version, --restart) is followed from the first complaint again.
+    def __init__(self, checkpoint_path: str = CHECKPOINT_PATH, interval: float = FOLLOW_INTERVAL_SECONDS):
+        self.checkpoint_path = checkpoint_path
+        self.interval = interval
+        self._run_key: Optional[tuple] = None
+        self._last_id = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(checkpoint: Dict) -> tuple:
+        return checkpoint.get("model_version"), checkpoint.get("started_at")
+
+    def _mark(self):
+        # Everything committed up to the current checkpoint is already in the freshly loaded structures
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        if checkpoint:
+            self._run_key, self._last_id = self._key(checkpoint), checkpoint["last_id"]
+
+    def poll(self, db: Session) -> int:
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        if not checkpoint:
+            return 0
+        after_id = self._last_id if self._key(checkpoint) == self._run_key else 0
+        if checkpoint["last_id"] <= after_id:
+            return 0
+        count = retrack_complaints(db, after_id, checkpoint["last_id"])
+        self._run_key, self._last_id = self._key(checkpoint), checkpoint["last_id"]
+        return count
+
+    def start(self, session_factory: Callable[[], Session]):
+        # Call before loading the duplicate index and dispatch queue
+        self._mark()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(session_factory,), name="reclassification-follower",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self, session_factory: Callable[[], Session]):
+        while not self._stop.wait(self.interval):
+            try:
+                with session_factory() as db:
+                    self.poll(db)
+            except Exception as e:
+                # Retried on the next poll; the range isn't marked done until it was re-tracked
+                logger.warning("Re-tracking reclassified complaints failed: %s", e)
+
+
+class ReclassificationService:
+    def __init__(self, db: Session, checkpoint_path: str = CHECKPOINT_PATH, chunk_size: int = CHUNK_SIZE,
+                 duty_cycle: float = DUTY_CYCLE):
+        self.db = db
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = chunk_size
+        self.duty_cycle = min(max(duty_cycle, 0.01), 1.0)
+        self.complaint_service = ComplaintService(db)
+
+    def load_checkpoint(self) -> Optional[Dict]:
+        return load_checkpoint(self.checkpoint_path)
+
+    def _save_checkpoint(self, checkpoint: Dict):
+        checkpoint["updated_at"] = datetime.utcnow().isoformat()
+        directory = os.path.dirname(self.checkpoint_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Write-then-rename so a crash mid-write never leaves a truncated checkpoint behind
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _start(self, restart: bool) -> Dict:
+        checkpoint = None if restart else self.load_checkpoint()
+        if checkpoint and checkpoint.get("model_version") == categorizer.model_version:
+            return checkpoint
+        return {
+            "model_version": categorizer.model_version,
+            "last_id": 0,
+            "processed": 0,
+            "changed": 0,
+            "started_at": datetime.utcnow().isoformat(),
+            "finished": False,
+        }
+
+    @staticmethod
+    def _chunk_statement():
+        # The rollup source columns double as the UPDATE guard and the old side of the rollup delta
+        return select(ComplaintSQL.id, ComplaintSQL.description,
+                      *(ComplaintSQL.__table__.c[name] for name in ROLLUP_SOURCE_COLUMNS))
+
+    def _updates_for_chunk(self, rows) -> List[Tuple[object, dict]]:
+        results = categorizer.categorize_batch([row.description or "" for row in rows])
+        updates = []
+        for row, result in zip(rows, results):
+            if (row.category, row.urgency_score, row.department) == (
+                    result["category"], result["urgency_score"], result["department"]):
+                continue
+            updates.append((row, {
+                **result,
+                **self.complaint_service.derived_fields(result["category"], result["urgency_score"],
+                                                        row.description or "")
+            }))
+        return updates
+
+    def _write_chunk(self, rows) -> int:
+        # Returns the number of complaints changed; all in the caller's transaction
+        changed = 0
+        deltas = RollupDeltas()
+        while rows:
+            missed = []
+            for row, values in self._updates_for_chunk(rows):
+                stored = self.db.execute(
+                    update(ComplaintSQL).where(ComplaintSQL.id == row.id, *rollup_guard(row)).values(**values)
+                    .returning(*(ComplaintSQL.__table__.c[name] for name in ROLLUP_SOURCE_COLUMNS))
+                ).first()
+                if stored is None:
+                    missed.append(row.id) # changed (or deleted) since it was read
+                    continue
+                # Move the complaint between analytics groups
+                deltas.add(row, -1)
+                deltas.add(stored)
+                changed += 1
+            rows = self.db.execute(
+                self._chunk_statement().where(ComplaintSQL.id.in_(missed)).order_by(ComplaintSQL.id)
+            ).all() if missed else []
+        self.complaint_service.apply_rollups(deltas)
+        return changed
+
+    def run(self, restart: bool = False, on_chunk: Optional[Callable[[Dict], None]] = None) -> Dict:
+        if not categorizer.ready:
+            categorizer.load()
+        checkpoint = self._start(restart)
+        if checkpoint["finished"]:
+            return checkpoint
+
+        while True:
+            chunk_started = time.perf_counter()
+            # Keyset pagination: each chunk is an index range scan however far into the table we are
+            rows = self.db.execute(
+                self._chunk_statement()
+                .where(ComplaintSQL.id > checkpoint["last_id"])
+                .order_by(ComplaintSQL.id)
+                .limit(self.chunk_size)
+            ).all()
+            if not rows:
+                break
+
+            changed = self._write_chunk(rows)
+            self.db.commit()
+
+            checkpoint["last_id"] = rows[-1].id
+            checkpoint["processed"] += len(rows)
+            checkpoint["changed"] += changed
+            self._save_checkpoint(checkpoint)
+            if on_chunk:
+                on_chunk(checkpoint)
+
+            worked = time.perf_counter() - chunk_started
+            time.sleep(worked * (1 / self.duty_cycle - 1))
+
+        checkpoint["finished"] = True
+        checkpoint["finished_at"] = datetime.utcnow().isoformat()
+        self._save_checkpoint(checkpoint)
+        return checkpoint
+
+
+# Started with the API; see app/main.py
+reclassification_follower = ReclassificationFollower()
+
+
+if __name__ == '__main__':
+    from ..db import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--duty-cycle', type=float, default=DUTY_CYCLE,
+                        help="fraction of time spent working, e.g. 0.25 sleeps 3x as long as each chunk took")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH)
+    parser.add_argument('--restart', action='store_true', help="ignore the checkpoint and start from the first complaint")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        service = ReclassificationService(db, args.checkpoint, args.chunk_size, args.duty_cycle)
+        result = service.run(
+            restart=args.restart,
+            on_chunk=lambda c: print(f"up to id {c['last_id']}: {c['processed']} processed, {c['changed']} changed")
+        )
+        print(json.dumps(result, indent=2))
+    finally:
+        db.close()
@@ -0,0 +1,115 @@
+"""
+Rows/sec for turning stored complaints into API responses.
+
+Compares the projection read path (ComplaintService.get_all_complaints: column select,
+Complaint.model_construct) with the previous one (ORM instances copied field by field into a
+validated Complaint). Both are then serialized the way FastAPI does for response_model=List[Complaint].
+Runs against a throwaway SQLite file, so the application database is untouched.
+
+    python -m benchmarks.complaint_serialization [--rows 20000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.models.complaint_model import Complaint
+from app.models.sql_models import Base, ComplaintSQL
+from app.services.complaint_service import ComplaintService
+
+CATEGORIES = ["water", "roads", "garbage", "electricity", "sewage", "safety"]
+
+
+def populate(engine, rows: int):
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(insert(ComplaintSQL), [
+            {
+                "citizen_id": str(i),
+                "description": f"complaint {i} about {rng.choice(CATEGORIES)} near ward {rng.randint(1, 200)}",
+                "language": "en",
+                "category": rng.choice(CATEGORIES),
+                "urgency_score": rng.randint(0, 100),
+                "department": "PWD",
+                "estimated_cost": rng.uniform(500, 50000),
+                "required_resources": ["Pipes", "Wrench Set", "Plumber"],
+                "suggested_actions": ["Inspect site", "Repair", "Verify"],
+                "tools_required": ["Wrench", "Gloves"],
+                "safety_notes": ["Wear gloves"],
+                "sla_hours": rng.choice([12, 24, 48]),
+                "status": "pending",
+            }
+            for i in range(rows)
+        ])
+
+
+def orm_field_copy(db: Session) -> List[Complaint]:
+    # The read path before projections: full ORM load, then a validating Complaint per row
+    return [
+        Complaint(
+            id=row.id,
+            citizen_id=row.citizen_id,
+            description=row.description,
+            language=row.language,
+            category=row.category,
+            urgency_score=row.urgency_score,
+            department=row.department,
+            estimated_cost=row.estimated_cost,
+            required_resources=row.required_resources,
+            suggested_actions=row.suggested_actions,
+            tools_required=row.tools_required,
+            safety_notes=row.safety_notes,
+            sla_hours=row.sla_hours,
+            status=row.status,
+            created_at=row.created_at
+        )
+        for row in db.query(ComplaintSQL).all()
+    ]
+
+
+def projection(db: Session) -> List[Complaint]:
+    return ComplaintService(db).get_all_complaints()
+
+
+def bench(engine, read, repeat: int):
+    adapter = TypeAdapter(List[Complaint])
+    read_seconds = total_seconds = 0.0
+    for _ in range(repeat):
+        with Session(engine) as db:
+            start = time.perf_counter()
+            complaints = read(db)
+            read_seconds += time.perf_counter() - start
+            # What FastAPI does with the return value: validate against response_model, then dump
+            adapter.dump_json(adapter.validate_python(complaints))
+            total_seconds += time.perf_counter() - start
+    return len(complaints), read_seconds, total_seconds
+
+
+def main(rows: int, repeat: int):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        Base.metadata.create_all(engine)
+        populate(engine, rows)
+        print(f"{'read path':<20} {'read rows/s':>12} {'response rows/s':>16}")
+        for name, read in [("orm + field copy", orm_field_copy), ("projection", projection)]:
+            count, read_seconds, total_seconds = bench(engine, read, repeat)
+            print(f"{name:<20} {count * repeat / read_seconds:>12,.0f} {count * repeat / total_seconds:>16,.0f}")
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
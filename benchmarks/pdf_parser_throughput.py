@@ -0,0 +1,57 @@
+"""
+Throughput of the single-pass circular fact extractor (app/pdf_parser.py) in MB/s.
+
+Text is taken from the text layer of every PDF in data/ (no OCR, so Tesseract isn't
+needed) and fed to the extractor page by page, the same way ingestion does.
+
+    python -m benchmarks.pdf_parser_throughput [--repeat 50]
+"""
+import argparse
+import glob
+import time
+
+import fitz  # PyMuPDF
+
+from app.pdf_parser import extract_facts
+
+
+def load_pages(pdf_path: str) -> list:
+    doc = fitz.open(pdf_path)
+    try:
+        return [page.get_text() + "\n" for page in doc]
+    finally:
+        doc.close()
+
+
+def bench(pages: list, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extract_facts(pages)
+    return time.perf_counter() - start
+
+
+def main(data_dir: str, repeat: int):
+    total_bytes = 0
+    total_seconds = 0.0
+    print(f"{'file':<50} {'pages':>6} {'KB':>8} {'MB/s':>8}")
+    for pdf_path in sorted(glob.glob(f"{data_dir}/*.pdf")):
+        pages = load_pages(pdf_path)
+        size = sum(len(page.encode("utf-8")) for page in pages)
+        if size == 0:
+            print(f"{pdf_path:<50} {len(pages):>6} {'-':>8} {'(no text layer)':>8}")
+            continue
+        seconds = bench(pages, repeat)
+        total_bytes += size * repeat
+        total_seconds += seconds
+        print(f"{pdf_path:<50} {len(pages):>6} {size / 1024:>8.1f} {size * repeat / seconds / 1e6:>8.2f}")
+
+    if total_seconds:
+        print(f"{'overall':<50} {'':>6} {'':>8} {total_bytes / total_seconds / 1e6:>8.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    main(args.data_dir, args.repeat)
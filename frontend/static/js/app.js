@@ -237,22 +237,38 @@ async function loadCirculars() {
 }
 
 // Function to load and display sorted complaints (for Admin)
-async function loadSortedComplaints() {
+let sortedComplaintsCursor = null; // next_cursor of the last page loaded
+let loadedSortedComplaints = [];
+
+async function loadSortedComplaints(append = false) {
     const sortedComplaintsListBody = document.querySelector('#sorted-complaints-list tbody');
     const sortedComplaintsMessage = document.getElementById('sorted-complaints-message');
-    sortedComplaintsListBody.innerHTML = ''; // Clear previous results
+    const loadMoreButton = document.getElementById('sorted-complaints-more');
+    if (!append) {
+        sortedComplaintsListBody.innerHTML = ''; // Clear previous results
+        sortedComplaintsCursor = null;
+        loadedSortedComplaints = [];
+    }
+    loadMoreButton.style.display = 'none';
     sortedComplaintsMessage.textContent = 'Loading prioritized complaints...';
 
     try {
-        const response = await authenticatedFetch('/api/complaints/sorted');
-        const complaints = await response.json();
-
-        if (complaints.length === 0) {
+        const url = sortedComplaintsCursor
+            ? `/api/complaints/sorted?cursor=${encodeURIComponent(sortedComplaintsCursor)}`
+            : '/api/complaints/sorted';
+        const response = await authenticatedFetch(url);
+        const page = await response.json();
+        const complaints = page.items;
+        loadedSortedComplaints = loadedSortedComplaints.concat(complaints);
+        sortedComplaintsCursor = page.next_cursor;
+
+        if (loadedSortedComplaints.length === 0) {
             sortedComplaintsMessage.textContent = 'No complaints to prioritize.';
             return;
         }
 
         sortedComplaintsMessage.textContent = ''; // Clear loading message
+        if (sortedComplaintsCursor) loadMoreButton.style.display = 'inline-block';
         complaints.forEach(complaint => {
             const row = sortedComplaintsListBody.insertRow();
             row.innerHTML = `
@@ -274,7 +290,9 @@ async function loadSortedComplaints() {
         });
 
         // Add event listeners for status change dropdowns
-        document.querySelectorAll('.complaint-status-select').forEach(selectElement => {
+        // (only rows added by this page; earlier rows already have theirs)
+        document.querySelectorAll('.complaint-status-select:not([data-bound])').forEach(selectElement => {
+            selectElement.dataset.bound = 'true';
             selectElement.addEventListener('change', async (event) => {
                 const complaintId = event.target.dataset.complaintId;
                 const newStatus = event.target.value;
@@ -296,13 +314,13 @@ async function loadSortedComplaints() {
                     } else {
                         alert(`Failed to update status for Complaint ID ${complaintId}: ${updatedComplaint.detail || 'Unknown error'}`);
                         // Revert dropdown to previous state on error
-                        event.target.value = complaints.find(c => c.id == complaintId).status; 
+                        event.target.value = loadedSortedComplaints.find(c => c.id == complaintId).status; 
                     }
                 } catch (error) {
                     console.error(`Error updating status for complaint ${complaintId}:`, error);
                     alert(`An error occurred while updating status for Complaint ID ${complaintId}.`);
                     // Revert dropdown to previous state on error
-                    event.target.value = complaints.find(c => c.id == complaintId).status; 
+                    event.target.value = loadedSortedComplaints.find(c => c.id == complaintId).status; 
                 }
             });
         });
@@ -313,6 +331,8 @@ async function loadSortedComplaints() {
     }
 }
 
+document.getElementById('sorted-complaints-more').addEventListener('click', () => loadSortedComplaints(true));
+
 // --- Navigation Handlers ---
 document.getElementById('nav-home').addEventListener('click', (e) => {
     e.preventDefault();
@@ -460,12 +480,41 @@ document.getElementById('pdfUploadForm').addEventListener('submit', async (e) =>
             body: formData,
         });
         const data = await response.json();
-        displayResponse('pdfResponse', data);
+        if (!response.ok) {
+            document.getElementById('pdfResponse').innerHTML = `<p style="color: red;">Upload failed: ${data.detail || response.statusText}</p>`;
+            return;
+        }
+        await pollCircularJob(data);
     } catch (error) {
         console.error('Error uploading PDF:', error);
     }
 });
 
+// Uploads are processed in the background (202 + job record); poll the job until it finishes
+const JOB_POLL_INTERVAL_MS = 1000;
+
+async function pollCircularJob(job) {
+    const outputElement = document.getElementById('pdfResponse');
+    while (job.status === 'queued' || job.status === 'running') {
+        const progress = job.page_count ? ` (${job.pages_done}/${job.page_count} pages)` : '';
+        outputElement.innerHTML = `<p><strong>Processing ${job.filename}:</strong> ${job.status}${progress}</p>`;
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const response = await authenticatedFetch(`/api/circulars/jobs/${job.id}`);
+        if (!response.ok) {
+            outputElement.innerHTML = '<p style="color: red;">Lost track of the processing job. Check the circulars list later.</p>';
+            return;
+        }
+        job = await response.json();
+    }
+
+    if (job.status === 'failed') {
+        outputElement.innerHTML = `<p style="color: red;">Processing ${job.filename} failed: ${job.error || 'unknown error'}</p>`;
+        return;
+    }
+    displayResponse('pdfResponse', job.circular);
+    if (job.duplicate) outputElement.innerHTML = '<p><em>This PDF was already uploaded; showing the stored circular.</em></p>' + outputElement.innerHTML;
+}
+
 // Document Generation - RTI
 document.getElementById('rtiForm').addEventListener('submit', async (e) => {
     e.preventDefault();